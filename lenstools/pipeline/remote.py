@@ -1,10 +1,6 @@
 from abc import ABCMeta,abstractproperty,abstractmethod
-import sys,os,glob
-
-if sys.version_info.major>=3:
-	import _pickle as pkl
-else:
-	import cPickle as pkl
+import os,glob,stat
+import pickle as pkl
 
 try:
 	from paramiko import SSHClient
@@ -19,6 +15,19 @@ try:
 except ImportError:
 	Repository = None
 
+###################################################
+###########Local directory listings################
+###################################################
+
+def _scandir(d):
+
+	#DirEntry already carries the file type from the directory read, no extra stat needed
+	try:
+		with os.scandir(d) as entries:
+			return [ (e.name,e.is_dir()) for e in entries ]
+	except OSError:
+		return list()
+
 ###################################################
 ###########SystemHandler class#####################
 ###################################################
@@ -27,6 +36,9 @@ class SystemHandler(object):
 
 	__metaclass__ = ABCMeta
 
+	#Whether the I/O methods can be called from several threads at once
+	threadsafe = False
+
 	##################################
 	######Abstract methods############
 	##################################
@@ -59,6 +71,10 @@ class SystemHandler(object):
 	def glob(self,n):
 		pass
 
+	@abstractmethod
+	def listdir(self,d):
+		pass
+
 	@abstractmethod
 	def open(self,f,mode):
 		pass
@@ -83,6 +99,9 @@ class LocalSystem(SystemHandler):
 
 	"""
 
+	#Local file system calls release the GIL and do not share state
+	threadsafe = True
+
 	#############################################
 	######Abstract method definitions############
 	#############################################
@@ -114,6 +133,9 @@ class LocalSystem(SystemHandler):
 	def glob(self,n):
 		return glob.glob(n)
 
+	def listdir(self,d):
+		return _scandir(d)
+
 	def open(self,f,mode):
 
 		if (self.readonly) and ("w" in mode or "a" in mode):
@@ -125,7 +147,7 @@ class LocalSystem(SystemHandler):
 		return pkl.load(fp)
 
 	def pickledump(self,obj,fp):
-		pkl.dump(obj,fp,protocol=2)
+		pkl.dump(obj,fp,protocol=pkl.HIGHEST_PROTOCOL)
 
 
 
@@ -188,6 +210,13 @@ class UnixSSH(SystemHandler):
 		stdin,stdout,stderr = self.client.exec_command("ls -d {0}".format(n))
 		return [ d.rstrip("\n").rstrip(":") for d in stdout.readlines("\n") ]
 
+	def listdir(self,d):
+
+		try:
+			return [ (a.filename,stat.S_ISDIR(a.st_mode)) for a in self.sftp.listdir_attr(d) ]
+		except IOError:
+			return list()
+
 	def open(self,f,mode):
 
 		if (self.readonly) and ("w" in mode or "a" in mode):
@@ -199,7 +228,7 @@ class UnixSSH(SystemHandler):
 		return pkl.loads(fp.read())
 
 	def pickledump(self,obj,fp):
-		fp.write(pkl.dumps(obj,protocol=2))
+		fp.write(pkl.dumps(obj,protocol=pkl.HIGHEST_PROTOCOL))
 
 
 
@@ -251,6 +280,9 @@ class LocalGit(SystemHandler):
 	def glob(self,n):
 		return glob.glob(n)
 
+	def listdir(self,d):
+		return _scandir(d)
+
 	def open(self,f,mode):
 		return GitFile(f,mode,repository=self.repository)
 
@@ -258,7 +290,7 @@ class LocalGit(SystemHandler):
 		return pkl.loads(fp.read())
 
 	def pickledump(self,obj,fp):
-		fp.write(pkl.dumps(obj,protocol=2))
+		fp.write(pkl.dumps(obj,protocol=pkl.HIGHEST_PROTOCOL))
 
 
 
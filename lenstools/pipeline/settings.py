@@ -391,6 +391,12 @@ class MapSettings(LTSettings):
 		self.plane_name_format = "snap{0}_potentialPlane{1}_normal{2}.{3}"
 		self.lens_type = "PotentialPlane"
 
+		#Memory budget (in MB) for caching lens planes between realizations (0 disables the cache)
+		self.plane_cache_MB = 0
+
+		#Log the peak memory usage every this many realizations
+		self.memory_log_interval = 10
+
 		self.map_resolution = 128
 		self.map_angle = 1.6 * u.deg
 		self.angle_unit = u.deg
@@ -468,6 +474,16 @@ class MapSettings(LTSettings):
 			self.lens_type = options.get(section,"lens_type")
 		except NoOptionError:
 			pass
+
+		try:
+			self.plane_cache_MB = options.getfloat(section,"plane_cache_MB")
+		except NoOptionError:
+			pass
+
+		try:
+			self.memory_log_interval = options.getint(section,"memory_log_interval")
+		except NoOptionError:
+			pass
 		
 		self.map_resolution = options.getint(section,"map_resolution")
 		
@@ -626,6 +642,12 @@ class CatalogSettings(LTSettings):
 		self.plane_format = "fits"
 		self.plane_name_format = "snap{0}_potentialPlane{1}_normal{2}.{3}"
 
+		#Memory budget (in MB) for caching lens planes between realizations (0 disables the cache)
+		self.plane_cache_MB = 0
+
+		#Log the peak memory usage every this many realizations
+		self.memory_log_interval = 10
+
 		#Random seed used to generate multiple catalog realizations
 		self.seed = 0
 
@@ -679,6 +701,16 @@ class CatalogSettings(LTSettings):
 		except NoOptionError:
 			pass
 
+		try:
+			settings.plane_cache_MB = options.getfloat(section,"plane_cache_MB")
+		except NoOptionError:
+			pass
+
+		try:
+			settings.memory_log_interval = options.getint(section,"memory_log_interval")
+		except NoOptionError:
+			pass
+
 		#Set of lens planes to be used during ray tracing
 		settings.seed = options.getint(section,"seed")
 
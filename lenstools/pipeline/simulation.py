@@ -6,6 +6,7 @@ import re
 import tarfile
 import json
 import itertools
+from concurrent.futures import ThreadPoolExecutor
 
 if sys.version_info.major>=3:
 	from io import StringIO
@@ -27,27 +28,43 @@ from .deploy import JobHandler
 from ..simulations.camb import CAMBTransferFromPower
 from ..simulations import Gadget2SnapshotDE
 from ..simulations.raytracing import PotentialPlane
+from ..simulations.logs import logpipeline
+
+#####################################################
+######Cosmological parameters in parameter files#####
+#####################################################
+
+_NGENIC_COSMOLOGY = (("Omega","Om0"),("OmegaLambda","Ode0"),("OmegaBaryon","Ob0"),("HubbleParam","h"))
+_GADGET2_COSMOLOGY = (("Omega0","Om0"),("OmegaLambda","Ode0"),("OmegaBaryon","Ob0"),("HubbleParam","h"))
+_DARK_ENERGY = (("w0","w0"),("wa","wa"))
 
 #####################################################
 ############Parse cosmology from string##############
 #####################################################
 
-def string2cosmo(s,name2attr):
+_PARMATCH = re.compile(r"([a-zA-Z]+)([0-9.\-]+)")
 
-	parmatch = re.compile(r"([a-zA-Z]+)([0-9.-]+)")
+#Directory names of collections (xxxbyyy), realizations (icN), seed files (seedN) and sub-catalogs (first-last)
+_GEOMATCH = re.compile(r"^([0-9]+)b([0-9]+(?:\.[0-9]*)?)$")
+_ICMATCH = re.compile(r"^ic([0-9]+)$")
+_SEEDMATCH = re.compile(r"^seed([0-9]+)$")
+_SUBCATALOGMATCH = re.compile(r"^([0-9]+)-([0-9]+)$")
+
+def string2cosmo(s,name2attr):
 
 	parameters_dict = dict()
 	parameters_list = list()
 	parameters = s.split("_")
 	neutrino_masses = list()
+	attr_of = name2attr.get
 
 	for parameter in parameters:
 				
-		try:
-			par,val = parmatch.match(parameter).groups()
-		except AttributeError:
+		m = _PARMATCH.match(parameter)
+		if m is None:
 			return None
-				
+
+		par,val = m.group(1),m.group(2)
 		parameters_list.append(par)
 
 		try:
@@ -57,10 +74,13 @@ def string2cosmo(s,name2attr):
 				parameters_dict["H0"] = 100.0*float(val)
 			elif par.startswith("mv"):
 				neutrino_masses.append(float(val))
-			else: 
-				parameters_dict[name2attr[par]] = float(val)
+			else:
+				attr = attr_of(par)
+				if attr is None:
+					return None
+				parameters_dict[attr] = float(val)
 		
-		except (ValueError,KeyError):
+		except ValueError:
 			return None
 
 	#Fill in neutrino parameters
@@ -146,7 +166,7 @@ def _retrieve(self,s):
 
 		#realization
 		if resource=="r":
-			current = current.realizations[int(index)]
+			current = current.getRealization(current.realization_numbers[int(index)])
 
 		#plane set
 		if resource=="p":
@@ -257,7 +277,7 @@ class SimulationBatch(object):
 		if not self.syshandler.isbatch(environment.home):
 			
 			self.syshandler.init(environment.home)
-			print("[+] {0} created on {1}".format(environment.home,self.syshandler.name))
+			logpipeline.info("[+] %s created on %s",environment.home,self.syshandler.name)
 
 			#Create also an "environment.ini" file that provides easy access to the current simulation batch from Home
 			with self.syshandler.open(os.path.join(environment.home,"environment.ini"),"w") as envfile:
@@ -268,7 +288,7 @@ class SimulationBatch(object):
 
 		if not self.syshandler.exists(environment.storage):
 			self.syshandler.mkdir(environment.storage)
-			print("[+] {0} created on {1}".format(environment.storage,self.syshandler.name))
+			logpipeline.info("[+] %s created on %s",environment.storage,self.syshandler.name)
 
 		#Indicize the simulation products
 		if indicize:
@@ -333,7 +353,7 @@ class SimulationBatch(object):
 		if self.syshandler.exists(self.infofile):
 			dirnames = self.info.keys()
 		else:
-			dirnames = [ os.path.basename(n) for n in self.syshandler.glob(os.path.join(self.environment.home,"*")) ]
+			dirnames = [ name for name,isdir in self.syshandler.listdir(self.environment.home) if isdir ]
 
 		#Cycle over directory names
 		for d in dirnames:
@@ -738,14 +758,17 @@ class SimulationBatch(object):
 
 		newModel = SimulationModel(cosmology=cosmology,environment=self.environment,parameters=parameters,syshandler=self.syshandler)
 
+		#Check only once if the batch is indicized
+		indexed = self.syshandler.exists(self.infofile)
+
 		for d in [newModel.home_subdir,newModel.storage_subdir]:
 			if not self.syshandler.exists(d):
 
 				self.syshandler.mkdir(d)
-				print("[+] {0} created on {1}".format(d,self.syshandler.name))
+				logpipeline.info("[+] %s created on %s",d,self.syshandler.name)
 
 				#Update dictionary if the batch is indicized
-				if self.syshandler.exists(self.infofile):
+				if indexed:
 					self.info[newModel.cosmo_id] = dict()
 
 			else:
@@ -832,7 +855,7 @@ class SimulationBatch(object):
 			
 			if not(self.syshandler.exists(d)):
 				self.syshandler.mkdir(d)
-				print("[+] {0} created on {1}".format(d,self.syshandler.name))
+				logpipeline.info("[+] %s created on %s",d,self.syshandler.name)
 
 		#Split realizations between independent jobs
 		realizations_per_chunk = len(realization_list)//chunks
@@ -934,7 +957,7 @@ class SimulationBatch(object):
 			
 			if not(self.syshandler.exists(d)):
 				self.syshandler.mkdir(d)
-				print("[+] {0} created on {1}".format(d,self.syshandler.name))
+				logpipeline.info("[+] %s created on %s",d,self.syshandler.name)
 
 		#Split realizations between independent jobs
 		realizations_per_chunk = len(realization_list)//chunks
@@ -957,7 +980,7 @@ class SimulationBatch(object):
 				box_size = float(box_size) * model.Mpc_over_h
 				collection = model.getCollection(box_size=box_size,nside=nside)
 
-				r = collection.getRealization(int(ic_number.strip("ic")))
+				r = collection.getRealization(int(_ICMATCH.match(ic_number).group(1)))
 
 				parameter_file = os.path.join(r.home_subdir,config_file)
 				if not(self.syshandler.exists(parameter_file)):
@@ -1043,7 +1066,7 @@ class SimulationBatch(object):
 			
 			if not(self.syshandler.exists(d)):
 				self.syshandler.mkdir(d)
-				print("[+] {0} created on {1}".format(d,self.syshandler.name))
+				logpipeline.info("[+] %s created on %s",d,self.syshandler.name)
 
 		#Split realizations between independent jobs
 		realizations_per_chunk = len(realization_list)//chunks
@@ -1076,7 +1099,7 @@ class SimulationBatch(object):
 				box_size = float(box_size) * model.Mpc_over_h
 				collection = model.getCollection(box_size=box_size,nside=nside)
 
-				r = collection.getRealization(int(ic_number.strip("ic")))
+				r = collection.getRealization(int(_ICMATCH.match(ic_number).group(1)))
 
 				parameter_file = os.path.join(r.home_subdir,config_file)
 				if not(self.syshandler.exists(parameter_file)):
@@ -1155,7 +1178,7 @@ class SimulationBatch(object):
 			
 			if not(self.syshandler.exists(d)):
 				self.syshandler.mkdir(d)
-				print("[+] {0} created on {1}".format(d,self.syshandler.name))
+				logpipeline.info("[+] %s created on %s",d,self.syshandler.name)
 
 		#Split realizations between independent jobs
 		realizations_per_chunk = len(realization_list)//chunks
@@ -1188,7 +1211,7 @@ class SimulationBatch(object):
 				box_size = float(box_size) * model.Mpc_over_h
 				collection = model.getCollection(box_size=box_size,nside=nside)
 
-				r = collection.getRealization(int(ic_number.strip("ic")))
+				r = collection.getRealization(int(_ICMATCH.match(ic_number).group(1)))
 
 				#Check that the cores per simulation matches the number of files per snapshot
 				with self.syshandler.open(os.path.join(r.home_subdir,"gadget2.p"),"rb") as settingsfile:
@@ -1278,7 +1301,7 @@ class SimulationBatch(object):
 			
 			if not(self.syshandler.exists(d)):
 				self.syshandler.mkdir(d)
-				print("[+] {0} created on {1}".format(d,self.syshandler.name))
+				logpipeline.info("[+] %s created on %s",d,self.syshandler.name)
 
 		#Split realizations between independent jobs
 		realizations_per_chunk = len(realization_list)//chunks
@@ -1411,7 +1434,7 @@ class SimulationBatch(object):
 			
 			if not(self.syshandler.exists(d)):
 				self.syshandler.mkdir(d)
-				print("[+] {0} created on {1}".format(d,self.syshandler.name))
+				logpipeline.info("[+] %s created on %s",d,self.syshandler.name)
 
 		#Split realizations between independent jobs
 		realizations_per_chunk = len(realization_list)//chunks
@@ -1572,7 +1595,7 @@ class TreeNode(object):
 			
 			if not self.syshandler.exists(dir_to_make):
 				self.syshandler.mkdir(dir_to_make)
-				print("[+] {0} created on {1}".format(dir_to_make,self.syshandler.name))
+				logpipeline.info("[+] %s created on %s",dir_to_make,self.syshandler.name)
 
 	################################################################################################################################
 
@@ -1641,10 +1664,47 @@ class SimulationModel(TreeNode):
 
 	"""
 
+	#Keep track of the NGenIC growth/velocity prefactors already computed (they depend only on the cosmology and the initial redshift)
+	_prefactors = dict()
+
 	@property
 	def cosmo_id(self):
-		base = "{0}{1:."+str(self.environment.cosmo_id_digits)+"f}"
-		return "_".join([ base.format(p,getattr(self.cosmology,self.environment.name2attr[p])) for p in self.parameters if (hasattr(self.cosmology,self.environment.name2attr[p]) and getattr(self.cosmology,self.environment.name2attr[p]) is not None)])
+
+		cosmo = self.cosmology
+		digits = self.environment.cosmo_id_digits
+
+		#Built once per node (nodes built from their parent state copy it along); rebuilt if the cosmology or the parameters change
+		cached = self.__dict__.get("_cosmo_id")
+		if cached is not None and cached[0] is cosmo and cached[1]==self.parameters and cached[2]==digits:
+			return cached[3]
+
+		name2attr = self.environment.name2attr
+		parts = list()
+		for p in self.parameters:
+			v = getattr(cosmo,name2attr[p],None)
+			if v is not None:
+				parts.append(f"{p}{v:.{digits}f}")
+
+		#Many tree nodes share the same id, keep a single copy of the string
+		cosmo_id = sys.intern("_".join(parts))
+		self._cosmo_id = (cosmo,self.parameters,digits,cosmo_id)
+		return cosmo_id
+
+	def _cosmologyLines(self,labels):
+
+		#Parameter file lines for the (label,attribute) pairs in labels, formatted once per node and cosmology
+		cosmo = self.cosmology
+		cached = self.__dict__.get("_cosmology_lines")
+		if cached is None or cached[0] is not cosmo:
+			cached = (cosmo,dict())
+			self._cosmology_lines = cached
+
+		text = cached[1].get(labels)
+		if text is None:
+			text = "".join([ f"{label}			{getattr(cosmo,attr):.6f}\n" for label,attr in labels ])
+			cached[1][labels] = text
+
+		return text
 
 	@property
 	def info(self):
@@ -1662,7 +1722,7 @@ class SimulationModel(TreeNode):
 		:param environment: environment settings of the current machine
 		:type environment: EnvironmentSettings
 
-		:param parameters: cosmological parameters to keep track of
+		:param parameters: cosmological parameters to keep track of (stored as a tuple)
 		:type parameters: list.
 
 		"""
@@ -1677,15 +1737,16 @@ class SimulationModel(TreeNode):
 			self.environment = environment
 
 		self.cosmology = cosmology
-		self.parameters = parameters
+		self.parameters = tuple(parameters)
 
 		#Define the scaled unit length for convenience
 		self.kpc_over_h = u.def_unit("kpc/h",u.kpc/self.cosmology.h)
 		self.Mpc_over_h = u.def_unit("Mpc/h",u.Mpc/self.cosmology.h)
 
 		#Create directories accordingly
-		self.home_subdir = os.path.join(self.environment.home,self.cosmo_id)
-		self.storage_subdir = os.path.join(self.environment.storage,self.cosmo_id)
+		cosmo_id = self.cosmo_id
+		self.home_subdir = f"{self.environment.home}{os.sep}{cosmo_id}"
+		self.storage_subdir = f"{self.environment.storage}{os.sep}{cosmo_id}"
 
 		for key in kwargs.keys():
 			setattr(self,key,kwargs[key])
@@ -1693,9 +1754,9 @@ class SimulationModel(TreeNode):
 
 	def __repr__(self):
 
-		representation_parameters = []
-		for p in self.parameters:
-			representation_parameters.append(("{0}={1:."+str(self.environment.cosmo_id_digits)+"f}").format(p,getattr(self.cosmology,self.environment.name2attr[p])))
+		digits = self.environment.cosmo_id_digits
+		name2attr = self.environment.name2attr
+		representation_parameters = [ f"{p}={getattr(self.cosmology,name2attr[p]):.{digits}f}" for p in self.parameters ]
 
 		return "<"+ " , ".join(representation_parameters) + ">"
 
@@ -1769,15 +1830,18 @@ class SimulationModel(TreeNode):
 
 		newSimulation = SimulationCollection(self.cosmology,self.environment,self.parameters,box_size,nside,syshandler=self.syshandler)
 
+		#Check only once if the batch is indicized
+		indexed = self.syshandler.exists(self.infofile)
+
 		#Make the corresponding directory if not already present
 		for d in [newSimulation.home_subdir,newSimulation.storage_subdir]:
 			if not self.syshandler.exists(d):
 
 				self.syshandler.mkdir(d)
-				print("[+] {0} created on {1}".format(d,self.syshandler.name))
+				logpipeline.info("[+] %s created on %s",d,self.syshandler.name)
 
 				#Update dictionary if the batch is indicized
-				if self.syshandler.exists(self.infofile):
+				if indexed:
 					self.info[newSimulation.cosmo_id][newSimulation.geometry_id] = dict()
 					self.info[newSimulation.cosmo_id][newSimulation.geometry_id]["nbody"] = dict()
 					self.info[newSimulation.cosmo_id][newSimulation.geometry_id]["map_sets"] = dict()
@@ -1800,13 +1864,13 @@ class SimulationModel(TreeNode):
 
 		#Allow to pass a geometry_id as first argument
 		if hasattr(box_size,"format"):
-			try:
-				parts = box_size.split("b")
-				nside = int(parts[0])
-				box_size = float(parts[1]) * self.Mpc_over_h
-			except (IndexError,ValueError):
+			m = _GEOMATCH.match(box_size)
+			if m is None:
 				return None
 
+			nside = int(m.group(1))
+			box_size = float(m.group(2)) * self.Mpc_over_h
+
 		assert nside is not None,"if you did not specify the second argument, it means the first should be in the form 'xxxbyyy'"
 
 		#See if the collection exists
@@ -1834,7 +1898,7 @@ class SimulationModel(TreeNode):
 		if self.syshandler.exists(self.infofile):
 			collection_names = self.info[self.cosmo_id].keys()
 		else:
-			collection_names = [ os.path.basename(d) for d in self.syshandler.glob(os.path.join(self.home_subdir,"*")) ]
+			collection_names = [ name for name,isdir in self.syshandler.listdir(self.home_subdir) if isdir ]
 
 		collection_list = list()
 
@@ -1897,7 +1961,7 @@ class SimulationModel(TreeNode):
 		for d in [ map_set.home_subdir,map_set.storage_subdir ]:
 			if not self.syshandler.exists(d):
 				self.syshandler.mkdir(d)
-				print("[+] {0} created on {1}".format(d,self.syshandler.name))
+				logpipeline.info("[+] %s created on %s",d,self.syshandler.name)
 
 		#Save a picked copy of the settings to use for future reference
 		with self.syshandler.open(os.path.join(map_set.home_subdir,"settings.p"),"wb") as settingsfile:
@@ -2011,12 +2075,17 @@ class SimulationCollection(SimulationModel):
 		self.box_size = box_size
 		self.nside = nside
 
+		#Convert the box size once, the parameter file writers only need the plain number
+		self._box_size_Mpc_over_h = box_size.to(self.Mpc_over_h).value
+		self._box_size_kpc_over_h = box_size.to(self.kpc_over_h).value
+
 		#Build the geometry_id
-		self.geometry_id = "{0}b{1}".format(nside,int(box_size.to(self.Mpc_over_h).value))
+		self.geometry_id = sys.intern("{0}b{1}".format(nside,int(self._box_size_Mpc_over_h)))
 
 		#Build the directory names
-		self.home_subdir = os.path.join(self.environment.home,self.cosmo_id,self.geometry_id)
-		self.storage_subdir = os.path.join(self.environment.storage,self.cosmo_id,self.geometry_id)
+		cosmo_id = self.cosmo_id
+		self.home_subdir = f"{self.environment.home}{os.sep}{cosmo_id}{os.sep}{self.geometry_id}"
+		self.storage_subdir = f"{self.environment.storage}{os.sep}{cosmo_id}{os.sep}{self.geometry_id}"
 
 
 	def __repr__(self):
@@ -2096,17 +2165,20 @@ class SimulationCollection(SimulationModel):
 		new_ic_index = len(ics_present) + 1
 
 		#Generate the new initial condition
-		newIC = SimulationIC(self.cosmology,self.environment,self.parameters,self.box_size,self.nside,new_ic_index,seed,syshandler=self.syshandler,**kwargs)
+		newIC = SimulationIC._from_collection(self,new_ic_index,seed,**kwargs)
+
+		#Check only once if the batch is indicized
+		indexed = self.syshandler.exists(self.infofile)
 
 		#Make dedicated directories for new initial condition,ics and snapshots
 		for d in [newIC.home_subdir,newIC.storage_subdir,newIC.ics_subdir,newIC.snapshot_subdir]:
 
 			if not self.syshandler.exists(d):
 				self.syshandler.mkdir(d)
-				print("[+] {0} created on {1}".format(d,self.syshandler.name))
+				logpipeline.info("[+] %s created on %s",d,self.syshandler.name)
 
 				#Update dictionary if the batch is indicized
-				if self.syshandler.exists(self.infofile):
+				if indexed:
 					self.info[newIC.cosmo_id][newIC.geometry_id]["nbody"][str(newIC.ic_index)] = dict()
 					self.info[newIC.cosmo_id][newIC.geometry_id]["nbody"][str(newIC.ic_index)]["plane_sets"] = dict()
 
@@ -2126,13 +2198,14 @@ class SimulationCollection(SimulationModel):
 	def getRealization(self,n):
 
 		#Check if this particular realization exists
-		newIC = SimulationIC(self.cosmology,self.environment,self.parameters,self.box_size,self.nside,n,seed=0,syshandler=self.syshandler)
+		newIC = SimulationIC._from_collection(self,n,seed=0)
 		if not(self.syshandler.exists(newIC.home_subdir)) or not(self.syshandler.exists(newIC.storage_subdir)):
 			return None
 
 		#Read the seed number
-		seed_filename = self.syshandler.glob(os.path.join(newIC.home_subdir,"seed*"))[0]
-		newIC.seed = int(os.path.basename(seed_filename).strip("seed"))
+		seed_match = [ m for m in (_SEEDMATCH.match(name) for name,isdir in self.syshandler.listdir(newIC.home_subdir)) if m is not None ][0]
+		seed_filename = os.path.join(newIC.home_subdir,seed_match.group(0))
+		newIC.seed = int(seed_match.group(1))
 
 		#Read ICFileBase,SnapshotFileBase from seed file
 		with self.syshandler.open(seed_filename,"r") as fp:
@@ -2160,17 +2233,48 @@ class SimulationCollection(SimulationModel):
 
 		"""
 
-		if self.syshandler.exists(self.infofile):
-			ic_numbers = [ int(n) for n in self.info[self.cosmo_id][self.geometry_id]["nbody"] ]
+		#Get realizations: the lookups are bound by file system latency, so overlap them when the system handler allows it
+		ic_numbers = self.realization_numbers
+		if self.syshandler.threadsafe and len(ic_numbers)>1:
+			with ThreadPoolExecutor(max_workers=min(32,len(ic_numbers))) as executor:
+				ic_list = list(executor.map(self.getRealization,ic_numbers))
 		else:
-			ic_numbers = [ int(os.path.basename(d).strip("ic")) for d in self.syshandler.glob(os.path.join(self.home_subdir,"ic*")) ]
-		
-		#Get realizations
-		ic_list = [ self.getRealization(ic) for ic in sorted(ic_numbers) ]
+			ic_list = [ self.getRealization(ic) for ic in ic_numbers ]
 
 		#Return to user
 		return ic_list
 
+	@property
+	def realization_numbers(self):
+
+		"""
+		List the indices of the available realizations for the current collection, without building the SimulationIC instances
+
+		:returns: sorted list.
+		:rtype: int
+
+		"""
+
+		if self.syshandler.exists(self.infofile):
+			ic_numbers = [ int(n) for n in self.info[self.cosmo_id][self.geometry_id]["nbody"] ]
+		else:
+			ic_numbers = [ int(m.group(1)) for m in (_ICMATCH.match(name) for name,isdir in self.syshandler.listdir(self.home_subdir) if isdir) if m is not None ]
+
+		return sorted(ic_numbers)
+
+	def iterRealizations(self):
+
+		"""
+		Iterate over the available realizations for the current collection, building each SimulationIC instance only when it is reached
+
+		:returns: generator.
+		:rtype: SimulationIC
+
+		"""
+
+		for ic in self.realization_numbers:
+			yield self.getRealization(ic)
+
 
 	################################################################################################################################
 
@@ -2192,14 +2296,17 @@ class SimulationCollection(SimulationModel):
 		#Instantiate SimulationMaps object
 		map_set = SimulationMaps(self.cosmology,self.environment,self.parameters,self.box_size,self.nside,settings,syshandler=self.syshandler)
 
+		#Check only once if the batch is indicized
+		indexed = self.syshandler.exists(self.infofile)
+
 		#Create dedicated directories
 		for d in [ map_set.home_subdir,map_set.storage_subdir ]:
 			if not self.syshandler.exists(d):
 				self.syshandler.mkdir(d)
-				print("[+] {0} created on {1}".format(d,self.syshandler.name))
+				logpipeline.info("[+] %s created on %s",d,self.syshandler.name)
 
 				#Update dictionary if the batch is indicized
-				if self.syshandler.exists(self.infofile):
+				if indexed:
 					self.info[map_set.cosmo_id][map_set.geometry_id]["map_sets"][settings.directory_name] = dict()
 
 		#Save a picked copy of the settings to use for future reference
@@ -2207,7 +2314,7 @@ class SimulationCollection(SimulationModel):
 			self.syshandler.pickledump(settings,settingsfile)
 
 		#Append the name of the map batch to a summary file
-		if not self.syshandler.exists(self.infofile):
+		if not indexed:
 			with self.syshandler.open(os.path.join(self.home_subdir,"sets.txt"),"a") as setsfile:
 				setsfile.write("{0}\n".format(settings.directory_name))
 
@@ -2286,14 +2393,17 @@ class SimulationCollection(SimulationModel):
 		#Instantiate SimulationMaps object
 		catalog = SimulationCatalog(self.cosmology,self.environment,self.parameters,self.box_size,self.nside,settings,syshandler=self.syshandler)
 
+		#Check only once if the batch is indicized
+		indexed = self.syshandler.exists(self.infofile)
+
 		#Create dedicated directories
 		for d in [ catalog.home_subdir,catalog.storage_subdir ]:
 			if not self.syshandler.exists(d):
 				self.syshandler.mkdir(d)
-				print("[+] {0} created on {1}".format(d,self.syshandler.name))
+				logpipeline.info("[+] %s created on %s",d,self.syshandler.name)
 
 				#Update dictionary if the batch is indicized
-				if self.syshandler.exists(self.infofile):
+				if indexed:
 					self.info[catalog.cosmo_id][catalog.geometry_id]["catalogs"][settings.directory_name] = dict()
 
 		#Save a picked copy of the settings to use for future reference
@@ -2301,7 +2411,7 @@ class SimulationCollection(SimulationModel):
 			self.syshandler.pickledump(settings,settingsfile)
 
 		#Append the name of the map batch to a summary file
-		if not self.syshandler.exists(self.infofile):
+		if not indexed:
 			with self.syshandler.open(os.path.join(self.home_subdir,"catalogs.txt"),"a") as setsfile:
 				setsfile.write("{0}\n".format(settings.directory_name))
 
@@ -2473,6 +2583,9 @@ class SimulationIC(SimulationCollection):
 
 	"""
 
+	#Keep track of the glass file resolutions already read (many ICs share the same glass file)
+	_glass_nside = dict()
+
 	def __init__(self,cosmology,environment,parameters,box_size,nside,ic_index,seed,ICFileBase="ics",SnapshotFileBase="snapshot",**kwargs):
 
 		super(SimulationIC,self).__init__(cosmology,environment,parameters,box_size,nside,**kwargs)
@@ -2482,18 +2595,57 @@ class SimulationIC(SimulationCollection):
 		self.seed = seed
 
 		#Save storage sub-directory name
-		self.home_subdir = os.path.join(self.home_subdir,"ic{0}".format(ic_index))
-		self.storage_subdir = os.path.join(self.storage_subdir,"ic{0}".format(ic_index))
+		self.home_subdir = f"{self.home_subdir}{os.sep}ic{ic_index}"
+		self.storage_subdir = f"{self.storage_subdir}{os.sep}ic{ic_index}"
 
 		#Save also snapshots and initial conditions dedicated sub-directories names
-		self.ics_subdir = os.path.join(self.storage_subdir,"ics")
-		self.snapshot_subdir = os.path.join(self.storage_subdir,"snapshots")
+		self.ics_subdir = f"{self.storage_subdir}{os.sep}ics"
+		self.snapshot_subdir = f"{self.storage_subdir}{os.sep}snapshots"
 
 		#Useful to keep track of
 		self.ICFileBase = ICFileBase
 		self.SnapshotFileBase = SnapshotFileBase
 
 		#Try to load in the simulation settings, if any are present
+		self._loadSettings()
+
+	@classmethod
+	def _from_collection(cls,collection,ic_index,seed,ICFileBase="ics",SnapshotFileBase="snapshot",**kwargs):
+
+		"""
+		Build a SimulationIC from the state of an already constructed SimulationCollection, skipping the unit definitions and the cosmo_id/geometry_id formatting of the full constructor
+
+		"""
+
+		newIC = cls.__new__(cls)
+		newIC.__dict__.update(collection.__dict__)
+
+		#Save random seed information as attribute
+		newIC.ic_index = ic_index
+		newIC.seed = seed
+
+		#Save storage sub-directory name
+		newIC.home_subdir = f"{collection.home_subdir}{os.sep}ic{ic_index}"
+		newIC.storage_subdir = f"{collection.storage_subdir}{os.sep}ic{ic_index}"
+
+		#Save also snapshots and initial conditions dedicated sub-directories names
+		newIC.ics_subdir = f"{newIC.storage_subdir}{os.sep}ics"
+		newIC.snapshot_subdir = f"{newIC.storage_subdir}{os.sep}snapshots"
+
+		#Useful to keep track of
+		newIC.ICFileBase = ICFileBase
+		newIC.SnapshotFileBase = SnapshotFileBase
+
+		for key in kwargs.keys():
+			setattr(newIC,key,kwargs[key])
+
+		#Try to load in the simulation settings, if any are present
+		newIC._loadSettings()
+
+		return newIC
+
+	def _loadSettings(self):
+
 		try:
 			with self.syshandler.open(os.path.join(self.home_subdir,"ngenic.p"),"rb") as settingsfile:
 				self.ngenic_settings = self.syshandler.pickleload(settingsfile)
@@ -2536,6 +2688,13 @@ class SimulationIC(SimulationCollection):
 	def realizations(self):
 		raise NotImplementedError
 
+	@property
+	def realization_numbers(self):
+		raise NotImplementedError
+
+	def iterRealizations(self):
+		raise NotImplementedError
+
 	def getRealization(self,ic):
 		raise NotImplementedError
 
@@ -2633,14 +2792,17 @@ class SimulationIC(SimulationCollection):
 		#Instantiate a SimulationPlanes object
 		new_plane_set = SimulationPlanes(self.cosmology,self.environment,self.parameters,self.box_size,self.nside,self.ic_index,self.seed,self.ICFileBase,self.SnapshotFileBase,settings,syshandler=self.syshandler)
 
+		#Check only once if the batch is indicized
+		indexed = self.syshandler.exists(self.infofile)
+
 		#Create the dedicated directory if not present already
 		for d in [new_plane_set.home_subdir,new_plane_set.storage_subdir]:
 			if not(self.syshandler.exists(d)):
 				self.syshandler.mkdir(d)
-				print("[+] {0} created on {1}".format(d,self.syshandler.name))
+				logpipeline.info("[+] %s created on %s",d,self.syshandler.name)
 
 				#Update dictionary if the batch is indicized
-				if self.syshandler.exists(self.infofile):
+				if indexed:
 					self.info[new_plane_set.cosmo_id][new_plane_set.geometry_id]["nbody"][str(new_plane_set.ic_index)]["plane_sets"][settings.directory_name] = dict()
 
 		#Save a pickled copy of the settings for future reference
@@ -2648,7 +2810,7 @@ class SimulationIC(SimulationCollection):
 			self.syshandler.pickledump(settings,settingsfile)
 
 		#Append the name of the plane batch to a summary file
-		if not self.syshandler.exists(self.infofile):
+		if not indexed:
 			with self.syshandler.open(os.path.join(self.home_subdir,"sets.txt"),"a") as setsfile:
 				setsfile.write("{0}\n".format(settings.directory_name))
 
@@ -2762,84 +2924,98 @@ class SimulationIC(SimulationCollection):
 		#The filename is automatically generated from the class instance
 		filename = os.path.join(self.home_subdir,"ngenic.param")
 
-		#Write the parameter file
-		with self.syshandler.open(filename,"w") as paramfile:
+		#Build the parameter file line by line
+		lines = list()
+
+		#Mesh and grid size
+		lines.append(f"Nmesh			{2*self.nside}\n")
+		lines.append(f"Nsample		{self.nside}\n")
 
-			#Mesh and grid size
-			paramfile.write("Nmesh			{0}\n".format(2*self.nside))
-			paramfile.write("Nsample		{0}\n".format(self.nside))
+		#Box
+		lines.append(f"Box 			{self._box_size_kpc_over_h:.1f}\n")
 
-			#Box
-			paramfile.write("Box 			{0:.1f}\n".format(self.box_size.to(self.kpc_over_h).value))
+		#Base names for outputs
+		lines.append(f"FileBase			{self.ICFileBase}\n")
+		lines.append(f"OutputDir			{os.path.abspath(self.ics)}\n")
 
-			#Base names for outputs
-			paramfile.write("FileBase			{0}\n".format(self.ICFileBase))
-			paramfile.write("OutputDir			{0}\n".format(os.path.abspath(self.ics)))
+		#Glass file
+		glass_file = os.path.abspath(settings.GlassFile)
+		lines.append(f"GlassFile			{glass_file}\n")
 
-			#Glass file
-			paramfile.write("GlassFile			{0}\n".format(os.path.abspath(settings.GlassFile)))
+		#Tiling
+		glass_key = (configuration.snapshot_handler,glass_file)
+		
+		if glass_key not in SimulationIC._glass_nside:
+			with configuration.snapshot_handler.open(glass_file) as glass: 
+				SimulationIC._glass_nside[glass_key] = glass.header["num_particles_total_side"]
+
+		nside_glass = SimulationIC._glass_nside[glass_key]
+		lines.append(f"TileFac			{self.nside//nside_glass}\n")
 
-			#Tiling
-			with configuration.snapshot_handler.open(os.path.abspath(settings.GlassFile)) as glass: 
-				nside_glass = glass.header["num_particles_total_side"]
-			paramfile.write("TileFac			{0}\n".format(self.nside//nside_glass))
+		#Cosmological parameters
+		lines.append(self._cosmologyLines(_NGENIC_COSMOLOGY))
 
-			#Cosmological parameters
-			paramfile.write("Omega			{0:.6f}\n".format(self.cosmology.Om0))
-			paramfile.write("OmegaLambda			{0:.6f}\n".format(self.cosmology.Ode0))
-			paramfile.write("OmegaBaryon			{0:.6f}\n".format(self.cosmology.Ob0))
-			paramfile.write("HubbleParam			{0:.6f}\n".format(self.cosmology.h))
+		if issubclass(configuration.snapshot_handler,Gadget2SnapshotDE):
+			lines.append(self._cosmologyLines(_DARK_ENERGY))
 
-			if issubclass(configuration.snapshot_handler,Gadget2SnapshotDE):
-				paramfile.write("w0			{0:.6f}\n".format(self.cosmology.w0))
-				paramfile.write("wa			{0:.6f}\n".format(self.cosmology.wa))
+		#Initial redshift
+		lines.append(f"Redshift 			{settings.Redshift:.6f}\n")
 
-			#Initial redshift
-			paramfile.write("Redshift 			{0:.6f}\n".format(settings.Redshift))
+		if issubclass(configuration.snapshot_handler,Gadget2SnapshotDE):
+		
+			#Compute the growth and velocity prefactors (only once for each cosmology and initial redshift)
+			cosmo = self.cosmology
+			prefactor_key = (cosmo.h,cosmo.Om0,cosmo.Ode0,cosmo.Ok0,cosmo.Onu0,cosmo.w0,cosmo.wa,settings.Redshift,settings._zmaxact)
 
-			if issubclass(configuration.snapshot_handler,Gadget2SnapshotDE):
+			if prefactor_key not in SimulationModel._prefactors:
 			
-				#Compute the growth and velocity prefactors
-				print("[+] Solving the linear growth ODE for {0}...".format(self.cosmo_id))
-				g = self.cosmology.growth_factor([settings._zmaxact,settings.Redshift,0.0])
+				logpipeline.info("[+] Solving the linear growth ODE for %s...",self.cosmo_id)
+				g = cosmo.growth_factor([settings._zmaxact,settings.Redshift,0.0])
 
-				print("[+] Computing prefactors...".format(self.cosmo_id))
+				logpipeline.info("[+] Computing prefactors...")
 				growth_prefactor = g[2,0] / g[1,0]
-				vel_prefactor = -0.1 * np.sqrt(1+settings.Redshift) *(self.cosmology.H(settings.Redshift)/self.cosmology.H(0)).value * g[1,1] / g[1,0]
+				vel_prefactor = -0.1 * np.sqrt(1+settings.Redshift) *(cosmo.H(settings.Redshift)/cosmo.H(0)).value * g[1,1] / g[1,0]
+				SimulationModel._prefactors[prefactor_key] = (growth_prefactor,vel_prefactor)
 
-				paramfile.write("GrowthFactor			{0:.6f}\n".format(growth_prefactor))
-				paramfile.write("VelocityPrefactor			{0:.6f}\n".format(vel_prefactor))
+			growth_prefactor,vel_prefactor = SimulationModel._prefactors[prefactor_key]
 
-			#Sigma8
-			paramfile.write("Sigma8				{0:.6f}\n".format(self.cosmology.sigma8))
+			lines.append(f"GrowthFactor			{growth_prefactor:.6f}\n")
+			lines.append(f"VelocityPrefactor			{vel_prefactor:.6f}\n")
 
-			#Power Spectrum settings
-			paramfile.write("SphereMode			{0}\n".format(settings.SphereMode))
-			paramfile.write("WhichSpectrum			{0}\n".format(settings.WhichSpectrum))
-			
-			ngenic_ps_file = os.path.join(self.environment.home,self.cosmo_id,self.geometry_id,"ngenic_matterpower_z{0:.6f}.txt".format(0.0))
+		#Sigma8
+		lines.append(f"Sigma8				{self.cosmology.sigma8:.6f}\n")
 
-			#Check if NGen-IC power spectrum file exists, if not throw exception
-			if not(self.syshandler.exists(ngenic_ps_file)) and settings.WhichSpectrum==2:
-				raise IOError("NGen-IC power spectrum file {0} does not exist yet!".format(ngenic_ps_file))
+		#Power Spectrum settings
+		lines.append(f"SphereMode			{settings.SphereMode}\n")
+		lines.append(f"WhichSpectrum			{settings.WhichSpectrum}\n")
+		
+		ngenic_ps_file = os.path.join(self.environment.home,self.cosmo_id,self.geometry_id,"ngenic_matterpower_z{0:.6f}.txt".format(0.0))
 
-			paramfile.write("FileWithInputSpectrum			{0}\n".format(ngenic_ps_file))
-			
-			paramfile.write("InputSpectrum_UnitLength_in_cm			{0:.6e}\n".format(settings.InputSpectrum_UnitLength_in_cm))
-			paramfile.write("ReNormalizeInputSpectrum		{0}\n".format(settings.ReNormalizeInputSpectrum))
-			paramfile.write("ShapeGamma			{0:.2f}\n".format(settings.ShapeGamma))
-			paramfile.write("PrimordialIndex			{0:.6f}\n".format(settings.PrimordialIndex))
+		#Check if NGen-IC power spectrum file exists, if not throw exception
+		if not(self.syshandler.exists(ngenic_ps_file)) and settings.WhichSpectrum==2:
+			raise IOError("NGen-IC power spectrum file {0} does not exist yet!".format(ngenic_ps_file))
+
+		lines.append(f"FileWithInputSpectrum			{ngenic_ps_file}\n")
+		
+		lines.append(f"InputSpectrum_UnitLength_in_cm			{settings.InputSpectrum_UnitLength_in_cm:.6e}\n")
+		lines.append(f"ReNormalizeInputSpectrum		{settings.ReNormalizeInputSpectrum}\n")
+		lines.append(f"ShapeGamma			{settings.ShapeGamma:.2f}\n")
+		lines.append(f"PrimordialIndex			{settings.PrimordialIndex:.6f}\n")
 
-			#Random seed
-			paramfile.write("Seed 			{0}\n".format(self.seed))
+		#Random seed
+		lines.append(f"Seed 			{self.seed}\n")
 
-			#Files written in parallel
-			paramfile.write("NumFilesWrittenInParallel			{0}\n".format(settings.NumFilesWrittenInParallel))
+		#Files written in parallel
+		lines.append(f"NumFilesWrittenInParallel			{settings.NumFilesWrittenInParallel}\n")
 
-			#Units
-			paramfile.write("UnitLength_in_cm 			{0:.6e}\n".format(settings.UnitLength_in_cm))
-			paramfile.write("UnitMass_in_g			{0:.6e}\n".format(settings.UnitMass_in_g))
-			paramfile.write("UnitVelocity_in_cm_per_s 			{0:.6e}\n".format(settings.UnitVelocity_in_cm_per_s))
+		#Units
+		lines.append(f"UnitLength_in_cm 			{settings.UnitLength_in_cm:.6e}\n")
+		lines.append(f"UnitMass_in_g			{settings.UnitMass_in_g:.6e}\n")
+		lines.append(f"UnitVelocity_in_cm_per_s 			{settings.UnitVelocity_in_cm_per_s:.6e}\n")
+
+		#Write the parameter file in one go
+		with self.syshandler.open(filename,"w") as paramfile:
+			paramfile.write("".join(lines))
 
 		#Save a pickled copy of the settings for future reference
 		with self.syshandler.open(os.path.join(self.home_subdir,"ngenic.p"),"wb") as settingsfile:
@@ -2849,7 +3025,7 @@ class SimulationIC(SimulationCollection):
 		self.ngenic_settings = settings
 
 		#Log and return
-		print("[+] NGenIC parameter file {0} written on {1}".format(filename,self.syshandler.name))
+		logpipeline.info("[+] NGenIC parameter file %s written on %s",filename,self.syshandler.name)
 
 	####################################################################################################################################
 
@@ -2869,82 +3045,65 @@ class SimulationIC(SimulationCollection):
 		#The filename is automatically generated from the class instance
 		filename = os.path.join(self.home_subdir,"gadget2.param")
 
-		#Write the parameter file
-		with self.syshandler.open(filename,"w") as paramfile:
-
-			#File names for initial condition and outputs
-			initial_condition_file = os.path.join(os.path.abspath(self.ics),self.ICFileBase)
-			paramfile.write("InitCondFile			{0}\n".format(initial_condition_file))
-			paramfile.write("OutputDir			{0}{1}\n".format(self.snapshots,os.path.sep))
-			paramfile.write("EnergyFile			{0}\n".format(settings.EnergyFile))
-			paramfile.write("InfoFile			{0}\n".format(settings.InfoFile))
-			paramfile.write("TimingsFile			{0}\n".format(settings.TimingsFile))
-			paramfile.write("CpuFile			{0}\n".format(settings.CpuFile))
-			paramfile.write("RestartFile			{0}\n".format(settings.RestartFile))
-			paramfile.write("SnapshotFileBase			{0}\n".format(self.SnapshotFileBase))
-
-			#Use outputs in the settings to write the OutputListFilename, and set this as the output list of the code
-			outputs_filename = os.path.join(self.home_subdir,"outputs.txt")
-			np.savetxt(outputs_filename,settings.OutputScaleFactor)
-			paramfile.write("OutputListFilename			{0}\n\n".format(os.path.abspath(outputs_filename)))
-
-			#CPU time limit section
-			paramfile.write(settings.writeSection("cpu_timings"))
-
-			#Code options section
-			paramfile.write(settings.writeSection("code_options"))
-
-			#Initial scale factor time
-			ic_filenames = self.syshandler.glob(initial_condition_file+"*")
-
-			try:
-				ic_snapshot = configuration.snapshot_handler.open(ic_filenames[0])
-				paramfile.write("TimeBegin			{0}\n".format(ic_snapshot.header["scale_factor"]))
-				ic_snapshot.close()
-			except (IndexError,IOError):
-				
-				#Read the initial redshift of the simulation from the NGenIC settings
-				with self.syshandler.open(os.path.join(self.home_subdir,"ngenic.p"),"rb") as ngenicfile:
-					ngenic_settings = self.syshandler.pickleload(ngenicfile)
-					assert isinstance(ngenic_settings,NGenICSettings)
-
-				#Write the corresponding section of the Gadget parameter file
-				paramfile.write("TimeBegin			{0:.6f}\n".format(1.0/(1+ngenic_settings.Redshift)))
+		#Build the parameter file line by line
+		lines = list()
+
+		#File names for initial condition and outputs
+		initial_condition_file = os.path.join(os.path.abspath(self.ics),self.ICFileBase)
+		lines.append(f"InitCondFile			{initial_condition_file}\n")
+		lines.append(f"OutputDir			{self.snapshots}{os.path.sep}\n")
+		lines.append(f"EnergyFile			{settings.EnergyFile}\n")
+		lines.append(f"InfoFile			{settings.InfoFile}\n")
+		lines.append(f"TimingsFile			{settings.TimingsFile}\n")
+		lines.append(f"CpuFile			{settings.CpuFile}\n")
+		lines.append(f"RestartFile			{settings.RestartFile}\n")
+		lines.append(f"SnapshotFileBase			{self.SnapshotFileBase}\n")
+
+		#Use outputs in the settings to write the OutputListFilename, and set this as the output list of the code
+		outputs_filename = os.path.join(self.home_subdir,"outputs.txt")
+		with self.syshandler.open(outputs_filename,"w") as outputsfile:
+			outputsfile.write("".join([ f"{a:.18e}\n" for a in settings.OutputScaleFactor ]))
+		lines.append(f"OutputListFilename			{os.path.abspath(outputs_filename)}\n\n")
+
+		#CPU time limit and code options sections
+		lines.append(settings.writeSections(["cpu_timings","code_options"]))
+
+		#Initial scale factor time
+		#Only one IC file is needed to read the header: a single directory listing avoids the glob expansion
+		ic_dir,ic_base = os.path.split(initial_condition_file)
+		ic_filenames = [ os.path.join(ic_dir,name) for name,isdir in self.syshandler.listdir(ic_dir) if name.startswith(ic_base) ][:1]
 
-			#Characteristics of run section
-			paramfile.write(settings.writeSection("characteristics_of_run"))
-
-			#Cosmological parameters
-			paramfile.write("Omega0			{0:.6f}\n".format(self.cosmology.Om0))
-			paramfile.write("OmegaLambda			{0:.6f}\n".format(self.cosmology.Ode0))
-			paramfile.write("OmegaBaryon			{0:.6f}\n".format(self.cosmology.Ob0))
-			paramfile.write("HubbleParam			{0:.6f}\n".format(self.cosmology.h))
-			paramfile.write("BoxSize			{0:.6f}\n".format(self.box_size.to(self.kpc_over_h).value))
-
-			if issubclass(configuration.snapshot_handler,Gadget2SnapshotDE):
-				paramfile.write("w0			{0:.6f}\n".format(self.cosmology.w0))
-				paramfile.write("wa			{0:.6f}\n\n".format(self.cosmology.wa))
-
-			#Output frequency section
-			paramfile.write(settings.writeSection("output_frequency"))
+		try:
+			ic_snapshot = configuration.snapshot_handler.open(ic_filenames[0])
+			lines.append(f"TimeBegin			{ic_snapshot.header['scale_factor']}\n")
+			ic_snapshot.close()
+		except (IndexError,IOError):
+			
+			#Read the initial redshift of the simulation from the NGenIC settings
+			with self.syshandler.open(os.path.join(self.home_subdir,"ngenic.p"),"rb") as ngenicfile:
+				ngenic_settings = self.syshandler.pickleload(ngenicfile)
+				assert isinstance(ngenic_settings,NGenICSettings)
 
-			#Accuracy of time integration section
-			paramfile.write(settings.writeSection("accuracy_time_integration"))
+			#Write the corresponding section of the Gadget parameter file
+			lines.append(f"TimeBegin			{1.0/(1+ngenic_settings.Redshift):.6f}\n")
 
-			#Tree algorithm section
-			paramfile.write(settings.writeSection("tree_algorithm"))
+		#Characteristics of run section
+		lines.append(settings.writeSection("characteristics_of_run"))
 
-			#SPH section
-			paramfile.write(settings.writeSection("sph"))
+		#Cosmological parameters
+		lines.append(self._cosmologyLines(_GADGET2_COSMOLOGY))
+		lines.append(f"BoxSize			{self._box_size_kpc_over_h:.6f}\n")
 
-			#Memory allocation section
-			paramfile.write(settings.writeSection("memory_allocation"))
+		if issubclass(configuration.snapshot_handler,Gadget2SnapshotDE):
+			lines.append(self._cosmologyLines(_DARK_ENERGY))
+			lines.append("\n")
 
-			#System of units section
-			paramfile.write(settings.writeSection("system_of_units"))
+		#Output frequency, accuracy of time integration, tree algorithm, SPH, memory allocation, system of units and softening lengths sections
+		lines.append(settings.writeSections(["output_frequency","accuracy_time_integration","tree_algorithm","sph","memory_allocation","system_of_units","softening"]))
 
-			#Softening lengths section
-			paramfile.write(settings.writeSection("softening"))
+		#Write the parameter file in one go
+		with self.syshandler.open(filename,"w") as paramfile:
+			paramfile.write("".join(lines))
 
 		#Save a pickled copy of the settings for future reference
 		with self.syshandler.open(os.path.join(self.home_subdir,"gadget2.p"),"wb") as settingsfile:
@@ -2954,7 +3113,7 @@ class SimulationIC(SimulationCollection):
 		self.gadget_settings = settings
 
 		#Log and exit
-		print("[+] Gadget2 parameter file {0} written on {1}".format(filename,self.syshandler.name))
+		logpipeline.info("[+] Gadget2 parameter file %s written on %s",filename,self.syshandler.name)
 
 
 ##############################################################
@@ -3104,6 +3263,13 @@ class SimulationMaps(SimulationCollection):
 	def realizations(self):
 		raise NotImplementedError
 
+	@property
+	def realization_numbers(self):
+		raise NotImplementedError
+
+	def iterRealizations(self):
+		raise NotImplementedError
+
 	def getRealization(self,ic):
 		raise NotImplementedError
 
@@ -3230,7 +3396,7 @@ class SimulationCatalog(SimulationCollection):
 		#Build the new representation string
 		return super(SimulationCatalog,self).__repr__() + " | Catalog set: {0} | Catalog files on disk: {1} ".format(self.settings.directory_name,len(catalogs_on_disk))
 
-	@property 
+	@property
 	def subcatalogs(self):
 
 		"""
@@ -3238,29 +3404,24 @@ class SimulationCatalog(SimulationCollection):
 
 		"""
 
-		#List the storage subdirectory, and find the sub-catalog directories
-		sub_catalog_directories = self.syshandler.glob(os.path.join(self.storage_subdir,"*-*"))
+		#List the storage subdirectory, and find the sub-catalog directories (the entry names are already the base names)
 		sub_catalogs = list()
 
 		#Build a SimulationSubCatalog instance for each sub_catalog found
-		for d in sub_catalog_directories:
-			basename = os.path.basename(d)
-			try:
+		for name,isdir in self.syshandler.listdir(self.storage_subdir):
+
+			m = _SUBCATALOGMATCH.match(name) if isdir else None
+			if m is None:
+				continue
 				
-				#Build
-				first_realization,last_realization = basename.split("-")
-				first_realization = int(first_realization)
-				last_realization = int(last_realization)
-				sub_catalog = SimulationSubCatalog(self.cosmology,self.environment,self.parameters,self.box_size,self.nside,self.settings,syshandler=self.syshandler)
-				sub_catalog.storage_subdir = os.path.join(sub_catalog.storage_subdir,basename)
-				sub_catalog._first_realization = first_realization
-				sub_catalog._last_realization = last_realization
-
-				#Append
-				sub_catalogs.append(sub_catalog)
-			
-			except ValueError:
-				pass
+			#Build
+			sub_catalog = SimulationSubCatalog(self.cosmology,self.environment,self.parameters,self.box_size,self.nside,self.settings,syshandler=self.syshandler)
+			sub_catalog.storage_subdir = f"{sub_catalog.storage_subdir}{os.sep}{name}"
+			sub_catalog._first_realization = int(m.group(1))
+			sub_catalog._last_realization = int(m.group(2))
+
+			#Append
+			sub_catalogs.append(sub_catalog)
 
 		#Sort according to first realization and return to user
 		sub_catalogs.sort(key=lambda c:c.first_realization)
@@ -3280,6 +3441,13 @@ class SimulationCatalog(SimulationCollection):
 	def realizations(self):
 		raise NotImplementedError
 
+	@property
+	def realization_numbers(self):
+		raise NotImplementedError
+
+	def iterRealizations(self):
+		raise NotImplementedError
+
 	def getRealization(self,ic):
 		raise NotImplementedError
 
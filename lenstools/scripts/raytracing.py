@@ -1,15 +1,11 @@
 ########################################################
 ############Ray Tracing scripts#########################
 ########################################################
-from __future__ import division,with_statement
 
 import sys,os
 import time
 import gc
 
-from operator import add
-from functools import reduce
-
 from lenstools.simulations.logs import logdriver,logstderr,peakMemory,peakMemoryAll
 
 from lenstools.utils.mpi import MPIWhirlPool
@@ -17,7 +13,7 @@ from lenstools.utils.mpi import MPIWhirlPool
 from lenstools import ConvergenceMap,OmegaMap,ShearMap
 from lenstools.catalog import Catalog,ShearCatalog
 
-from lenstools.simulations.raytracing import RayTracer,DensityPlane
+from lenstools.simulations.raytracing import RayTracer,DensityPlane,PlaneCache
 from lenstools.pipeline.simulation import SimulationBatch
 from lenstools.pipeline.settings import MapSettings,TelescopicMapSettings,CatalogSettings
 
@@ -26,6 +22,11 @@ from lenstools.scripts import integration_types
 import numpy as np
 import astropy.units as u
 
+try:
+	import numexpr
+except ImportError:
+	numexpr = None
+
 #############################################################
 #########Spilt realizations in subdirectories################
 #############################################################
@@ -43,12 +44,131 @@ def _subdirectories(num_realizations,realizations_in_subdir):
 
 	return s
 
+#############################################################
+#########Realizations handled by this task###################
+#############################################################
+
+def _realizations(pool,first,last):
+
+	if pool is None:
+		return range(first,last)
+
+	#Tasks pick up the next realization when done with the previous one, so a slow realization does not stall the others
+	return pool.queue(first,last)
+
+#############################################################
+#########Read shared files only on the master task###########
+#############################################################
+
+def _readOnMaster(pool,reader,*args):
+
+	if pool is None:
+		return reader(*args)
+
+	#The master task reads the file, the other tasks receive the parsed result instead of all hitting the same file
+	result = reader(*args) if pool.is_master() else None
+	return pool.comm.bcast(result,root=0)
+
+#############################################################
+#########Read the lens plane summary information#############
+#############################################################
+
+def _planeInfo(info_filename,Mpc_over_h):
+
+	snapshot_numbers = list()
+	distances = list()
+	lens_redshifts = list()
+
+	#Each line of the info file reads s=<snapshot>,d=<distance> <unit>,z=<redshift>
+	with open(info_filename,"r") as infofile:
+		for line in infofile:
+
+			#Stop if there is nothing more to read
+			line = line.strip("\n")
+			if line=="":
+				break
+
+			#Split the line in snapshot,distance,redshift
+			line = line.split(",")
+
+			snapshot_numbers.append(int(line[0].split("=")[1]))
+		
+			distance,unit = line[1].split("=")[1].split(" ")
+			if unit=="Mpc/h":
+				distances.append(float(distance)*Mpc_over_h)
+			else:
+				distances.append(float(distance)*getattr(u,unit))
+
+			lens_redshifts.append(float(line[2].split("=")[1]))
+
+	return snapshot_numbers,distances,lens_redshifts
+
+#############################################################
+#########Lens planes shared between realizations#############
+#############################################################
+
+def _planeCache(settings):
+
+	#Settings pickled before the option existed do not have it
+	cache_MB = getattr(settings,"plane_cache_MB",0)
+	if not cache_MB:
+		return None
+
+	return PlaneCache(int(cache_MB*1024**2))
+
+#############################################################
+#########Lensing quantities from the jacobians###############
+#############################################################
+
+#Each quantity is built in a single output buffer, without intermediate temporaries the size of the map;
+#if numexpr is available the arithmetic is evaluated in one multithreaded pass over the jacobian
+
+#Under MPI each task already occupies a core: numexpr must not spawn its own thread pool in every task
+def _pinThreads(pool):
+	if (pool is not None) and (numexpr is not None):
+		numexpr.set_num_threads(1)
+
+def _convergence(jacobian):
+
+	if numexpr is not None:
+		kappa = np.empty(jacobian.shape[1:],dtype=jacobian.dtype)
+		return numexpr.evaluate("1.0-0.5*(j0+j3)",local_dict={"j0":jacobian[0],"j3":jacobian[3]},out=kappa,casting="same_kind")
+
+	kappa = np.add(jacobian[0],jacobian[3])
+	kappa *= -0.5
+	kappa += 1.0
+	return kappa
+
+def _shear(jacobian):
+	gamma = np.empty((2,)+jacobian.shape[1:],dtype=jacobian.dtype)
+
+	if numexpr is not None:
+		numexpr.evaluate("0.5*(j3-j0)",local_dict={"j0":jacobian[0],"j3":jacobian[3]},out=gamma[0],casting="same_kind")
+		numexpr.evaluate("-0.5*(j1+j2)",local_dict={"j1":jacobian[1],"j2":jacobian[2]},out=gamma[1],casting="same_kind")
+		return gamma
+
+	np.subtract(jacobian[3],jacobian[0],out=gamma[0])
+	gamma[0] *= 0.5
+	np.add(jacobian[1],jacobian[2],out=gamma[1])
+	gamma[1] *= -0.5
+	return gamma
+
+def _omega(jacobian):
+
+	if numexpr is not None:
+		omega = np.empty(jacobian.shape[1:],dtype=jacobian.dtype)
+		return numexpr.evaluate("-0.5*(j2-j1)",local_dict={"j1":jacobian[1],"j2":jacobian[2]},out=omega,casting="same_kind")
+
+	omega = np.subtract(jacobian[2],jacobian[1])
+	omega *= -0.5
+	return omega
+
 #####################################################################################
 #######Callback to call during raytracing to save the convergence at every step######
 #####################################################################################
 
 def convergence_callback(jacobian,tracer,k,realization,angle,map_batch,settings):
-	convMap = ConvergenceMap(data=1.0-0.5*(jacobian[0]+jacobian[3]),angle=angle)
+	convMap = ConvergenceMap(data=_convergence(jacobian),angle=angle)
 	savename = os.path.join(map_batch.storage_subdir,"WLconv_z{0:.2f}_{1:04d}r.{2}".format(tracer.redshift[k],realization+1,settings.format))
 	logdriver.debug("Saving convergence map to {0}".format(savename)) 
 	convMap.save(savename)
@@ -62,6 +182,7 @@ def singleRedshift(pool,batch,settings,batch_id):
 	#Safety check
 	assert isinstance(pool,MPIWhirlPool) or (pool is None)
 	assert isinstance(batch,SimulationBatch)
+	_pinThreads(pool)
 
 	parts = batch_id.split("|")
 
@@ -103,7 +224,7 @@ def singleRedshift(pool,batch,settings,batch_id):
 	if settings.override_with_local:
 
 		local_settings_file = os.path.join(map_batch.home_subdir,"settings.p")
-		settings = MapSettings.read(local_settings_file)
+		settings = _readOnMaster(pool,MapSettings.read,local_settings_file)
 		assert isinstance(settings,MapSettings)
 
 		if (pool is None) or (pool.is_master()):
@@ -163,21 +284,18 @@ def singleRedshift(pool,batch,settings,batch_id):
 	except AttributeError:
 		realization_offset = 0
 
-	if pool is None:
-		first_map_realization = 0 + realization_offset
-		last_map_realization = map_realizations + realization_offset
-		realizations_per_task = map_realizations
+	first_map_realization = 0 + realization_offset
+	last_map_realization = map_realizations + realization_offset
+
+	if (pool is None) or (pool.is_master()):
 		logdriver.debug("Generating lensing map realizations from {0} to {1}".format(first_map_realization+1,last_map_realization))
-	else:
-		assert map_realizations%(pool.size+1)==0,"Perfect load-balancing enforced, map_realizations must be a multiple of the number of MPI tasks!"
-		realizations_per_task = map_realizations//(pool.size+1)
-		first_map_realization = realizations_per_task*pool.rank + realization_offset
-		last_map_realization = realizations_per_task*(pool.rank+1) + realization_offset
-		logdriver.debug("Task {0} will generate lensing map realizations from {1} to {2}".format(pool.rank,first_map_realization+1,last_map_realization))
 
 	#Planes will be read from this path
 	plane_path = os.path.join("{0}","ic{1}","{2}")
 
+	#Plane directories for each collection and nbody realization, formatted once for all the realizations
+	plane_dirs = [ [ plane_path.format(coll.storage_subdir,ic,plane_set[c]) for ic in nbody_realizations[c] ] for c,coll in enumerate(collection) ]
+
 	if (pool is None) or (pool.is_master()):
 		for c,coll in enumerate(collection):
 			logdriver.info("Reading planes from {0}".format(plane_path.format(coll.storage_subdir,"-".join([str(n) for n in nbody_realizations[c]]),plane_set[c])))
@@ -191,9 +309,15 @@ def singleRedshift(pool,batch,settings,batch_id):
 	if (pool is None) or (pool.is_master()):
 		logdriver.info("Reading lens plane summary information from {0}".format(info_filename))
 
-	#Read how many snapshots are available
-	with open(info_filename,"r") as infofile:
-		num_snapshots = len(infofile.readlines())
+	#Read the lens specifications once (assume the info file is the same for all nbody realizations)
+	snapshot_numbers,distances,lens_redshifts = _readOnMaster(pool,_planeInfo,info_filename,model.Mpc_over_h)
+	num_snapshots = len(snapshot_numbers)
+
+	#Select the right collection for each lens: the last one whose cut redshift is not above the lens redshift
+	lens_collections = np.clip(np.searchsorted(cut_redshifts,lens_redshifts,side="right")-1,0,None)
+
+	#Number of nbody realizations, cut points and normals to choose from for each lens
+	plane_choices = np.array([ (len(nbody_realizations[c]),len(cut_points[c]),len(normals[c])) for c in lens_collections ],dtype=np.int32)
 
 	#Save path for the maps
 	save_path = map_batch.storage_subdir
@@ -201,6 +325,10 @@ def singleRedshift(pool,batch,settings,batch_id):
 	if (pool is None) or (pool.is_master()):
 		logdriver.info("Lensing maps will be saved to {0}".format(save_path))
 
+	#Planes drawn again in later realizations are not read from disk again, within the memory budget
+	plane_cache = _planeCache(settings)
+	memory_log_interval = max(getattr(settings,"memory_log_interval",1),1)
+
 	begin = time.time()
 
 	#Log initial memory load
@@ -208,14 +336,22 @@ def singleRedshift(pool,batch,settings,batch_id):
 	if (pool is None) or (pool.is_master()):
 		logstderr.info("Initial memory usage: {0:.3f} (task), {1[0]:.3f} (all {1[1]} tasks)".format(peak_memory_task,peak_memory_all))
 
+	#Start a bucket of light rays from a regular grid of initial positions (the same for all realizations)
+	b = np.linspace(0.0,map_angle.value,resolution)
+	xx,yy = np.meshgrid(b,b)
+	pos = np.array([xx,yy]) * map_angle.unit
+
 	#We need one of these for cycles for each map random realization
-	for rloc,r in enumerate(range(first_map_realization,last_map_realization)):
+	for rloc,r in enumerate(_realizations(pool,first_map_realization,last_map_realization)):
+
+		#Random state that generates the realization (same stream as seeding the global generator, without touching its state)
+		random_state = np.random.RandomState(settings.seed + r)
 
-		#Set random seed to generate the realizations
-		np.random.seed(settings.seed + r)
+		#Randomization of planes: one draw for all the lenses, in the same order as drawing lens by lens
+		randomizer = random_state.randint(low=0,high=plane_choices,dtype=np.int32)
 
 		#Instantiate the RayTracer
-		tracer = RayTracer()
+		tracer = RayTracer(plane_cache=plane_cache,random_state=random_state)
 
 		#Force garbage collection
 		gc.collect()
@@ -228,53 +364,27 @@ def singleRedshift(pool,batch,settings,batch_id):
 		###############Add the lenses to the system##################
 		#############################################################
 
-		#Open the info file to read the lens specifications (assume the info file is the same for all nbody realizations)
-		infofile = open(info_filename,"r")
-
-		#Read the info file line by line, and decide if we should add the particular lens corresponding to that line or not
+		#Cycle over the lens specifications, and decide which lens to add for each one
 		for s in range(num_snapshots):
 
-			#Read the line
-			line = infofile.readline().strip("\n")
-
-			#Stop if there is nothing more to read
-			if line=="":
-				break
-
-			#Split the line in snapshot,distance,redshift
-			line = line.split(",")
-
-			snapshot_number = int(line[0].split("=")[1])
-		
-			distance,unit = line[1].split("=")[1].split(" ")
-			if unit=="Mpc/h":
-				distance = float(distance)*model.Mpc_over_h
-			else:
-				distance = float(distance)*getattr(u,"unit")
-
-			lens_redshift = float(line[2].split("=")[1])
+			snapshot_number = snapshot_numbers[s]
+			distance = distances[s]
+			lens_redshift = lens_redshifts[s]
 
 			#Select the right collection
-			for n,z in enumerate(cut_redshifts):
-				if lens_redshift>=z:
-					c = n
+			c = lens_collections[s]
 
 			#Randomization of planes
-			nbody = np.random.randint(low=0,high=len(nbody_realizations[c]))
-			cut = np.random.randint(low=0,high=len(cut_points[c]))
-			normal = np.random.randint(low=0,high=len(normals[c]))
+			nbody,cut,normal = randomizer[s]
 
 			#Log to user
 			logdriver.debug("Realization,snapshot=({0},{1}) --> NbodyIC,cut_point,normal=({2},{3},{4})".format(r,s,nbody_realizations[c][nbody],cut_points[c][cut],normals[c][normal]))
 
 			#Add the lens to the system
 			logdriver.info("Adding lens at redshift {0}".format(lens_redshift))
-			plane_name = batch.syshandler.map(os.path.join(plane_path.format(collection[c].storage_subdir,nbody_realizations[c][nbody],plane_set[c]),settings.plane_name_format.format(snapshot_number,cut_points[c][cut],normals[c][normal],settings.plane_format)))
+			plane_name = batch.syshandler.map(os.path.join(plane_dirs[c][nbody],settings.plane_name_format.format(snapshot_number,cut_points[c][cut],normals[c][normal],settings.plane_format)))
 			tracer.addLens((plane_name,distance,lens_redshift))
 
-		#Close the infofile
-		infofile.close()
-
 		now = time.time()
 		logdriver.info("Plane specification reading completed in {0:.3f}s".format(now-start))
 		last_timestamp = now
@@ -286,11 +396,6 @@ def singleRedshift(pool,batch,settings,batch_id):
 		logdriver.info("Reordering completed in {0:.3f}s".format(now-last_timestamp))
 		last_timestamp = now
 
-		#Start a bucket of light rays from a regular grid of initial positions
-		b = np.linspace(0.0,map_angle.value,resolution)
-		xx,yy = np.meshgrid(b,b)
-		pos = np.array([xx,yy]) * map_angle.unit
-
 		if settings.tomographic_convergence:
 
 			#Trace the ray deflections and save the convergence at every step
@@ -308,7 +413,7 @@ def singleRedshift(pool,batch,settings,batch_id):
 			#Compute shear,convergence and omega from the jacobians
 			if settings.convergence or settings.reduced_shear or settings.reduced_shear_convergence:
 		
-				convMap = ConvergenceMap(data=1.0-0.5*(jacobian[0]+jacobian[3]),angle=map_angle,cosmology=map_batch.cosmology,redshift=source_redshift)
+				convMap = ConvergenceMap(data=_convergence(jacobian),angle=map_angle,cosmology=map_batch.cosmology,redshift=source_redshift)
 				
 				if settings.convergence:
 					savename = batch.syshandler.map(os.path.join(save_path,"WLconv_z{0:.2f}_{1:04d}r.{2}".format(source_redshift,r+1,settings.format)))
@@ -320,7 +425,7 @@ def singleRedshift(pool,batch,settings,batch_id):
 	
 			if settings.shear or settings.convergence_ks or settings.reduced_shear or settings.reduced_shear_convergence:
 		
-				shearMap = ShearMap(data=np.array([0.5*(jacobian[3]-jacobian[0]),-0.5*(jacobian[1]+jacobian[2])]),angle=map_angle,cosmology=map_batch.cosmology,redshift=source_redshift)
+				shearMap = ShearMap(data=_shear(jacobian),angle=map_angle,cosmology=map_batch.cosmology,redshift=source_redshift)
 
 				if settings.shear:
 					savename = batch.syshandler.map(os.path.join(save_path,"WLshear_z{0:.2f}_{1:04d}r.{2}".format(source_redshift,r+1,settings.format)))
@@ -352,28 +457,37 @@ def singleRedshift(pool,batch,settings,batch_id):
 	
 			if settings.omega:
 		
-				omegaMap = OmegaMap(data=-0.5*(jacobian[2]-jacobian[1]),angle=map_angle,cosmology=map_batch.cosmology,redshift=source_redshift)
+				omegaMap = OmegaMap(data=_omega(jacobian),angle=map_angle,cosmology=map_batch.cosmology,redshift=source_redshift)
 				savename = batch.syshandler.map(os.path.join(save_path,"WLomega_z{0:.2f}_{1:04d}r.{2}".format(source_redshift,r+1,settings.format)))
 				logdriver.info("Saving omega map to {0}".format(savename))
 				omegaMap.save(savename)
 
 		now = time.time()
 		
-		#Log peak memory usage to stdout
-		peak_memory_task,peak_memory_all = peakMemory(),peakMemoryAll(pool)
 		logdriver.info("Weak lensing calculations for realization {0} completed in {1:.3f}s".format(r+1,now-last_timestamp))
-		logdriver.info("Peak memory usage: {0:.3f} (task), {1[0]:.3f} (all {1[1]} tasks)".format(peak_memory_task,peak_memory_all))
+
+		#Poll the peak memory usage only every few realizations handled by this task
+		if (rloc+1)%memory_log_interval:
+			continue
+
+		#Log peak memory usage to stdout (task only: tasks run different numbers of realizations, so no collective calls in this loop)
+		peak_memory_task = peakMemory()
+		logdriver.info("Peak memory usage: {0:.3f} (task)".format(peak_memory_task))
 
 		#Log progress and peak memory usage to stderr
 		if (pool is None) or (pool.is_master()):
-			logstderr.info("Progress: {0:.2f}%, peak memory usage: {1:.3f} (task), {2[0]:.3f} (all {2[1]} tasks)".format(100*(rloc+1.)/realizations_per_task,peak_memory_task,peak_memory_all))
+			logstderr.info("Progress: {0:.2f}%, peak memory usage: {1:.3f} (task)".format(100*(r-realization_offset+1.)/map_realizations,peak_memory_task))
 	
 	#Safety sync barrier
 	if pool is not None:
 		pool.comm.Barrier()
 
+	#Log final peak memory usage, now that all the tasks are done
+	peak_memory_task,peak_memory_all = peakMemory(),peakMemoryAll(pool)
+
 	if (pool is None) or (pool.is_master()):	
 		now = time.time()
+		logstderr.info("Final peak memory usage: {0:.3f} (task), {1[0]:.3f} (all {1[1]} tasks)".format(peak_memory_task,peak_memory_all))
 		logdriver.info("Total runtime {0:.3f}s".format(now-begin))
 
 ############################################################################################################################################################################
@@ -436,7 +550,7 @@ def losIntegrate(pool,batch,settings,batch_id):
 	if settings.override_with_local:
 
 		local_settings_file = os.path.join(map_batch.home_subdir,"settings.p")
-		settings = MapSettings.read(local_settings_file)
+		settings = _readOnMaster(pool,MapSettings.read,local_settings_file)
 		assert isinstance(settings,MapSettings)
 
 		if (pool is None) or (pool.is_master()):
@@ -503,21 +617,18 @@ def losIntegrate(pool,batch,settings,batch_id):
 	except AttributeError:
 		realization_offset = 0
 
-	if pool is None:
-		first_map_realization = 0 + realization_offset
-		last_map_realization = map_realizations + realization_offset
-		realizations_per_task = map_realizations
+	first_map_realization = 0 + realization_offset
+	last_map_realization = map_realizations + realization_offset
+
+	if (pool is None) or (pool.is_master()):
 		logdriver.debug("Generating lensing map realizations from {0} to {1}".format(first_map_realization+1,last_map_realization))
-	else:
-		assert map_realizations%(pool.size+1)==0,"Perfect load-balancing enforced, map_realizations must be a multiple of the number of MPI tasks!"
-		realizations_per_task = map_realizations//(pool.size+1)
-		first_map_realization = realizations_per_task*pool.rank + realization_offset
-		last_map_realization = realizations_per_task*(pool.rank+1) + realization_offset
-		logdriver.debug("Task {0} will generate lensing map realizations from {1} to {2}".format(pool.rank,first_map_realization+1,last_map_realization))
 
 	#Planes will be read from this path
 	plane_path = os.path.join("{0}","ic{1}","{2}")
 
+	#Plane directories for each collection and nbody realization, formatted once for all the realizations
+	plane_dirs = [ [ plane_path.format(coll.storage_subdir,ic,plane_set[c]) for ic in nbody_realizations[c] ] for c,coll in enumerate(collection) ]
+
 	if (pool is None) or (pool.is_master()):
 		for c,coll in enumerate(collection):
 			logdriver.info("Reading planes from {0}".format(plane_path.format(coll.storage_subdir,"-".join([str(n) for n in nbody_realizations[c]]),plane_set[c])))
@@ -531,9 +642,15 @@ def losIntegrate(pool,batch,settings,batch_id):
 	if (pool is None) or (pool.is_master()):
 		logdriver.info("Reading lens plane summary information from {0}".format(info_filename))
 
-	#Read how many snapshots are available
-	with open(info_filename,"r") as infofile:
-		num_snapshots = len(infofile.readlines())
+	#Read the lens specifications once (assume the info file is the same for all nbody realizations)
+	snapshot_numbers,distances,lens_redshifts = _readOnMaster(pool,_planeInfo,info_filename,model.Mpc_over_h)
+	num_snapshots = len(snapshot_numbers)
+
+	#Select the right collection for each lens: the last one whose cut redshift is not above the lens redshift
+	lens_collections = np.clip(np.searchsorted(cut_redshifts,lens_redshifts,side="right")-1,0,None)
+
+	#Number of nbody realizations, cut points and normals to choose from for each lens
+	plane_choices = np.array([ (len(nbody_realizations[c]),len(cut_points[c]),len(normals[c])) for c in lens_collections ],dtype=np.int32)
 
 	#Save path for the maps
 	save_path = map_batch.storage_subdir
@@ -541,6 +658,10 @@ def losIntegrate(pool,batch,settings,batch_id):
 	if (pool is None) or (pool.is_master()):
 		logdriver.info("Lensing maps will be saved to {0}".format(save_path))
 
+	#Planes drawn again in later realizations are not read from disk again, within the memory budget
+	plane_cache = _planeCache(settings)
+	memory_log_interval = max(getattr(settings,"memory_log_interval",1),1)
+
 	begin = time.time()
 
 	#Log initial memory load
@@ -548,17 +669,25 @@ def losIntegrate(pool,batch,settings,batch_id):
 	if (pool is None) or (pool.is_master()):
 		logstderr.info("Initial memory usage: {0:.3f} (task), {1[0]:.3f} (all {1[1]} tasks)".format(peak_memory_task,peak_memory_all))
 
+	#Start a bucket of light rays from a regular grid of initial positions (the same for all realizations)
+	b = np.linspace(0.0,map_angle.value,resolution)
+	xx,yy = np.meshgrid(b,b)
+	pos = np.array([xx,yy]) * map_angle.unit
+
 	#We need one of these for cycles for each map random realization
-	for rloc,r in enumerate(range(first_map_realization,last_map_realization)):
+	for rloc,r in enumerate(_realizations(pool,first_map_realization,last_map_realization)):
 
-		#Set random seed to generate the realizations
-		np.random.seed(settings.seed + r)
+		#Random state that generates the realization (same stream as seeding the global generator, without touching its state)
+		random_state = np.random.RandomState(settings.seed + r)
+
+		#Randomization of planes: one draw for all the lenses, in the same order as drawing lens by lens
+		randomizer = random_state.randint(low=0,high=plane_choices,dtype=np.int32)
 
 		#Instantiate the RayTracer
 		if settings.lens_type=="PotentialPlane":
-			tracer = RayTracer()
+			tracer = RayTracer(plane_cache=plane_cache,random_state=random_state)
 		elif settings.lens_type=="DensityPlane":
-			tracer = RayTracer(lens_type=DensityPlane)
+			tracer = RayTracer(lens_type=DensityPlane,plane_cache=plane_cache,random_state=random_state)
 		else:
 			raise ValueError("Lens type {0} not recognized!".format(settings.lens_type))
 
@@ -573,53 +702,27 @@ def losIntegrate(pool,batch,settings,batch_id):
 		###############Add the lenses to the system##################
 		#############################################################
 
-		#Open the info file to read the lens specifications (assume the info file is the same for all nbody realizations)
-		infofile = open(info_filename,"r")
-
-		#Read the info file line by line, and decide if we should add the particular lens corresponding to that line or not
+		#Cycle over the lens specifications, and decide which lens to add for each one
 		for s in range(num_snapshots):
 
-			#Read the line
-			line = infofile.readline().strip("\n")
-
-			#Stop if there is nothing more to read
-			if line=="":
-				break
-
-			#Split the line in snapshot,distance,redshift
-			line = line.split(",")
-
-			snapshot_number = int(line[0].split("=")[1])
-		
-			distance,unit = line[1].split("=")[1].split(" ")
-			if unit=="Mpc/h":
-				distance = float(distance)*model.Mpc_over_h
-			else:
-				distance = float(distance)*getattr(u,"unit")
-
-			lens_redshift = float(line[2].split("=")[1])
+			snapshot_number = snapshot_numbers[s]
+			distance = distances[s]
+			lens_redshift = lens_redshifts[s]
 
 			#Select the right collection
-			for n,z in enumerate(cut_redshifts):
-				if lens_redshift>=z:
-					c = n
+			c = lens_collections[s]
 
 			#Randomization of planes
-			nbody = np.random.randint(low=0,high=len(nbody_realizations[c]))
-			cut = np.random.randint(low=0,high=len(cut_points[c]))
-			normal = np.random.randint(low=0,high=len(normals[c]))
+			nbody,cut,normal = randomizer[s]
 
 			#Log to user
 			logdriver.debug("Realization,snapshot=({0},{1}) --> NbodyIC,cut_point,normal=({2},{3},{4})".format(r,s,nbody_realizations[c][nbody],cut_points[c][cut],normals[c][normal]))
 
 			#Add the lens to the system
 			logdriver.info("Adding lens at redshift {0}".format(lens_redshift))
-			plane_name = batch.syshandler.map(os.path.join(plane_path.format(collection[c].storage_subdir,nbody_realizations[c][nbody],plane_set[c]),settings.plane_name_format.format(snapshot_number,cut_points[c][cut],normals[c][normal],settings.plane_format)))
+			plane_name = batch.syshandler.map(os.path.join(plane_dirs[c][nbody],settings.plane_name_format.format(snapshot_number,cut_points[c][cut],normals[c][normal],settings.plane_format)))
 			tracer.addLens((plane_name,distance,lens_redshift))
 
-		#Close the infofile
-		infofile.close()
-
 		now = time.time()
 		logdriver.info("Plane specification reading completed in {0:.3f}s".format(now-start))
 		last_timestamp = now
@@ -631,11 +734,6 @@ def losIntegrate(pool,batch,settings,batch_id):
 		logdriver.info("Reordering completed in {0:.3f}s".format(now-last_timestamp))
 		last_timestamp = now
 
-		#Start a bucket of light rays from a regular grid of initial positions
-		b = np.linspace(0.0,map_angle.value,resolution)
-		xx,yy = np.meshgrid(b,b)
-		pos = np.array([xx,yy]) * map_angle.unit
-
 		#Save intermediate results
 		if settings.tomographic_convergence:
 			callback = save_intermediate
@@ -698,21 +796,30 @@ def losIntegrate(pool,batch,settings,batch_id):
 
 		now = time.time()
 		
-		#Log peak memory usage to stdout
-		peak_memory_task,peak_memory_all = peakMemory(),peakMemoryAll(pool)
 		logdriver.info("Weak lensing calculations for realization {0} completed in {1:.3f}s".format(r+1,now-last_timestamp))
-		logdriver.info("Peak memory usage: {0:.3f} (task), {1[0]:.3f} (all {1[1]} tasks)".format(peak_memory_task,peak_memory_all))
+
+		#Poll the peak memory usage only every few realizations handled by this task
+		if (rloc+1)%memory_log_interval:
+			continue
+
+		#Log peak memory usage to stdout (task only: tasks run different numbers of realizations, so no collective calls in this loop)
+		peak_memory_task = peakMemory()
+		logdriver.info("Peak memory usage: {0:.3f} (task)".format(peak_memory_task))
 
 		#Log progress and peak memory usage to stderr
 		if (pool is None) or (pool.is_master()):
-			logstderr.info("Progress: {0:.2f}%, peak memory usage: {1:.3f} (task), {2[0]:.3f} (all {2[1]} tasks)".format(100*(rloc+1.)/realizations_per_task,peak_memory_task,peak_memory_all))
+			logstderr.info("Progress: {0:.2f}%, peak memory usage: {1:.3f} (task)".format(100*(r-realization_offset+1.)/map_realizations,peak_memory_task))
 	
 	#Safety sync barrier
 	if pool is not None:
 		pool.comm.Barrier()
 
+	#Log final peak memory usage, now that all the tasks are done
+	peak_memory_task,peak_memory_all = peakMemory(),peakMemoryAll(pool)
+
 	if (pool is None) or (pool.is_master()):	
 		now = time.time()
+		logstderr.info("Final peak memory usage: {0:.3f} (task), {1[0]:.3f} (all {1[1]} tasks)".format(peak_memory_task,peak_memory_all))
 		logdriver.info("Total runtime {0:.3f}s".format(now-begin))
 
 ############################################################################################################################################################################
@@ -728,6 +835,7 @@ def simulatedCatalog(pool,batch,settings,batch_id):
 	assert isinstance(pool,MPIWhirlPool) or (pool is None)
 	assert isinstance(batch,SimulationBatch)
 	assert isinstance(settings,CatalogSettings)
+	_pinThreads(pool)
 
 	#Separate the id into cosmo_id and geometry_id
 	cosmo_id,geometry_id = batch_id.split("|")
@@ -747,7 +855,7 @@ def simulatedCatalog(pool,batch,settings,batch_id):
 	if settings.override_with_local:
 
 		local_settings_file = os.path.join(catalog.home_subdir,"settings.p")
-		settings = CatalogSettings.read(local_settings_file)
+		settings = _readOnMaster(pool,CatalogSettings.read,local_settings_file)
 		assert isinstance(settings,CatalogSettings)
 
 		if (pool is None) or (pool.is_master()):
@@ -765,20 +873,16 @@ def simulatedCatalog(pool,batch,settings,batch_id):
 	#Read the total number of galaxies to raytrace from the settings
 	total_num_galaxies = settings.total_num_galaxies
 
-	#Pre-allocate numpy arrays
-	initial_positions = np.zeros((2,total_num_galaxies)) * settings.catalog_angle_unit
-	galaxy_redshift = np.zeros(total_num_galaxies)
+	#Collect the galaxy positions and redshifts of each catalog, they are joined at the end
+	galaxy_x = list()
+	galaxy_y = list()
+	galaxy_z = list()
 
 	#Keep track of the number of galaxies for each catalog
 	galaxies_in_catalog = list()
 
 	#Fill in initial positions and redshifts
 	for galaxy_position_file in settings.input_files:
-
-		try:
-			galaxies_before = reduce(add,galaxies_in_catalog)
-		except TypeError:
-			galaxies_before = 0
 	
 		#Read the galaxy positions and redshifts from the position catalog
 		if (pool is None) or (pool.is_master()):
@@ -799,13 +903,20 @@ def simulatedCatalog(pool,batch,settings,batch_id):
 			#Save a copy of the position catalog to the simulated catalogs directory
 			position_catalog.write(os.path.join(catalog_save_path,os.path.basename(galaxy_position_file)),overwrite=True)
 
-		#Fill in initial positions and redshifts
-		initial_positions[0,galaxies_before:galaxies_before+len(position_catalog)] = position_catalog["x"] * getattr(u,position_catalog.meta["AUNIT"])
-		initial_positions[1,galaxies_before:galaxies_before+len(position_catalog)] = position_catalog["y"] * getattr(u,position_catalog.meta["AUNIT"])
-		galaxy_redshift[galaxies_before:galaxies_before+len(position_catalog)] = position_catalog["z"]
+		#Fill in initial positions and redshifts (the catalog angle units match the settings ones, checked above)
+		galaxy_x.append(np.asarray(position_catalog["x"]))
+		galaxy_y.append(np.asarray(position_catalog["y"]))
+		galaxy_z.append(np.asarray(position_catalog["z"]))
 
 	#Make sure that the total number of galaxies matches, and units are correct
-	assert reduce(add,galaxies_in_catalog)==total_num_galaxies,"The total number of galaxies in the catalogs, {0}, does not match the number provided in the settings, {1}".format(reduce(add,galaxies_in_catalog),total_num_galaxies)
+	assert sum(galaxies_in_catalog)==total_num_galaxies,"The total number of galaxies in the catalogs, {0}, does not match the number provided in the settings, {1}".format(sum(galaxies_in_catalog),total_num_galaxies)
+
+	#Join the catalogs in a single copy
+	initial_positions = np.vstack((np.concatenate(galaxy_x),np.concatenate(galaxy_y))) * settings.catalog_angle_unit
+	galaxy_redshift = np.concatenate(galaxy_z)
+
+	#Offsets of each catalog in the joined arrays
+	galaxy_offsets = np.concatenate(([0],np.cumsum(galaxies_in_catalog))).astype(int)
 
 	##########################################################################################################################################################
 	####################################Initial positions and redshifts of galaxies loaded####################################################################
@@ -843,28 +954,27 @@ def simulatedCatalog(pool,batch,settings,batch_id):
 	except AttributeError:
 		realization_offset = 0
 
-	if pool is None:
-		first_realization = 0 + realization_offset
-		last_realization = catalog_realizations + realization_offset
-		realizations_per_task = catalog_realizations
+	first_realization = 0 + realization_offset
+	last_realization = catalog_realizations + realization_offset
+
+	if (pool is None) or (pool.is_master()):
 		logdriver.debug("Generating lensing catalog realizations from {0} to {1}".format(first_realization+1,last_realization))
-	else:
-		assert catalog_realizations%(pool.size+1)==0,"Perfect load-balancing enforced, catalog_realizations must be a multiple of the number of MPI tasks!"
-		realizations_per_task = catalog_realizations//(pool.size+1)
-		first_realization = realizations_per_task*pool.rank + realization_offset
-		last_realization = realizations_per_task*(pool.rank+1) + realization_offset
-		logdriver.debug("Task {0} will generate lensing catalog realizations from {1} to {2}".format(pool.rank,first_realization+1,last_realization))
 
 
 	#Planes will be read from this path
 	plane_path = os.path.join(collection.storage_subdir,"ic{0}",settings.plane_set)
+	plane_dirs = [ plane_path.format(ic) for ic in nbody_realizations ]
 
 	if (pool is None) or (pool.is_master()):
 		logdriver.info("Reading planes from {0}".format(plane_path.format("-".join([str(n) for n in nbody_realizations]))))
 
-	#Read how many snapshots are available
-	with open(batch.syshandler.map(os.path.join(plane_path.format(nbody_realizations[0]),"info.txt")),"r") as infofile:
-		num_snapshots = len(infofile.readlines())
+	#Read the lens specifications once (assume the info file is the same for all nbody realizations)
+	snapshot_numbers,distances,lens_redshifts = _readOnMaster(pool,_planeInfo,batch.syshandler.map(os.path.join(plane_path.format(nbody_realizations[0]),"info.txt")),model.Mpc_over_h)
+	num_snapshots = len(snapshot_numbers)
+
+	#Planes drawn again in later realizations are not read from disk again, within the memory budget
+	plane_cache = _planeCache(settings)
+	memory_log_interval = max(getattr(settings,"memory_log_interval",1),1)
 
 	begin = time.time()
 
@@ -874,13 +984,16 @@ def simulatedCatalog(pool,batch,settings,batch_id):
 		logstderr.info("Initial memory usage: {0:.3f} (task), {1[0]:.3f} (all {1[1]} tasks)".format(peak_memory_task,peak_memory_all))
 
 	#We need one of these for cycles for each map random realization
-	for rloc,r in enumerate(range(first_realization,last_realization)):
+	for rloc,r in enumerate(_realizations(pool,first_realization,last_realization)):
+
+		#Random state that generates the realization (same stream as seeding the global generator, without touching its state)
+		random_state = np.random.RandomState(settings.seed + r)
 
-		#Set random seed to generate the realizations
-		np.random.seed(settings.seed + r)
+		#Randomization of planes: one draw for all the lenses, in the same order as drawing lens by lens
+		randomizer = random_state.randint(low=0,high=(len(nbody_realizations),len(cut_points),len(normals)),size=(num_snapshots,3),dtype=np.int32)
 
 		#Instantiate the RayTracer
-		tracer = RayTracer()
+		tracer = RayTracer(plane_cache=plane_cache,random_state=random_state)
 
 		#Force garbage collection
 		gc.collect()
@@ -893,48 +1006,24 @@ def simulatedCatalog(pool,batch,settings,batch_id):
 		###############Add the lenses to the system##################
 		#############################################################
 
-		#Open the info file to read the lens specifications (assume the info file is the same for all nbody realizations)
-		infofile = open(os.path.join(plane_path.format(nbody_realizations[0]),"info.txt"),"r")
-
-		#Read the info file line by line, and decide if we should add the particular lens corresponding to that line or not
+		#Cycle over the lens specifications, and decide which lens to add for each one
 		for s in range(num_snapshots):
 
-			#Read the line
-			line = infofile.readline().strip("\n")
-
-			#Stop if there is nothing more to read
-			if line=="":
-				break
-
-			#Split the line in snapshot,distance,redshift
-			line = line.split(",")
-
-			snapshot_number = int(line[0].split("=")[1])
-		
-			distance,unit = line[1].split("=")[1].split(" ")
-			if unit=="Mpc/h":
-				distance = float(distance)*model.Mpc_over_h
-			else:
-				distance = float(distance)*getattr(u,"unit")
-
-			lens_redshift = float(line[2].split("=")[1])
+			snapshot_number = snapshot_numbers[s]
+			distance = distances[s]
+			lens_redshift = lens_redshifts[s]
 
 			#Randomization of planes
-			nbody = np.random.randint(low=0,high=len(nbody_realizations))
-			cut = np.random.randint(low=0,high=len(cut_points))
-			normal = np.random.randint(low=0,high=len(normals))
+			nbody,cut,normal = randomizer[s]
 
 			#Log to user
 			logdriver.debug("Realization,snapshot=({0},{1}) --> NbodyIC,cut_point,normal=({2},{3},{4})".format(r,s,nbody_realizations[nbody],cut_points[cut],normals[normal]))
 
 			#Add the lens to the system
 			logdriver.info("Adding lens at redshift {0}".format(lens_redshift))
-			plane_name = batch.syshandler.map(os.path.join(plane_path.format(nbody_realizations[nbody]),settings.plane_name_format.format(snapshot_number,cut_points[cut],normals[normal],settings.plane_format)))
+			plane_name = batch.syshandler.map(os.path.join(plane_dirs[nbody],settings.plane_name_format.format(snapshot_number,cut_points[cut],normals[normal],settings.plane_format)))
 			tracer.addLens((plane_name,distance,lens_redshift))
 
-		#Close the infofile
-		infofile.close()
-
 		now = time.time()
 		logdriver.info("Plane specification reading completed in {0:.3f}s".format(now-start))
 		last_timestamp = now
@@ -955,17 +1044,14 @@ def simulatedCatalog(pool,batch,settings,batch_id):
 
 		#Build the shear catalog and save it to disk
 		if settings.reduced_shear:
-			shear_catalog = ShearCatalog([(jacobian[3]-jacobian[0])/(jacobian[3]+jacobian[0]),-(jacobian[1]+jacobian[2])/(jacobian[3]+jacobian[0])],names=("shear1","shear2"))
+			trace = jacobian[3]+jacobian[0]
+			shear_catalog = ShearCatalog([(jacobian[3]-jacobian[0])/trace,-(jacobian[1]+jacobian[2])/trace],names=("shear1","shear2"))
 		else:
-			shear_catalog = ShearCatalog([0.5*(jacobian[3]-jacobian[0]),-0.5*(jacobian[1]+jacobian[2])],names=("shear1","shear2"))
+			gamma = _shear(jacobian)
+			shear_catalog = ShearCatalog([gamma[0],gamma[1]],names=("shear1","shear2"))
 
 		for n,galaxy_position_file in enumerate(settings.input_files):
 
-			try:
-				galaxies_before = reduce(add,galaxies_in_catalog[:n])
-			except TypeError:
-				galaxies_before = 0
-		
 			#Build savename
 			if settings.reduced_shear:
 				shear_root = "WLredshear_"
@@ -982,26 +1068,35 @@ def simulatedCatalog(pool,batch,settings,batch_id):
 			else:
 				logdriver.info("Saving simulated shear catalog to {0}".format(shear_catalog_savename))
 			
-			shear_catalog[galaxies_before:galaxies_before+galaxies_in_catalog[n]].write(shear_catalog_savename,overwrite=True)
+			shear_catalog[galaxy_offsets[n]:galaxy_offsets[n+1]].write(shear_catalog_savename,overwrite=True)
 
 		now = time.time()
 
-		#Log peak memory usage to stdout
-		peak_memory_task,peak_memory_all = peakMemory(),peakMemoryAll(pool)
 		logdriver.info("Weak lensing calculations for realization {0} completed in {1:.3f}s".format(r+1,now-last_timestamp))
-		logdriver.info("Peak memory usage: {0:.3f} (task), {1[0]:.3f} (all {1[1]} tasks)".format(peak_memory_task,peak_memory_all))
+
+		#Poll the peak memory usage only every few realizations handled by this task
+		if (rloc+1)%memory_log_interval:
+			continue
+
+		#Log peak memory usage to stdout (task only: tasks run different numbers of realizations, so no collective calls in this loop)
+		peak_memory_task = peakMemory()
+		logdriver.info("Peak memory usage: {0:.3f} (task)".format(peak_memory_task))
 
 		#Log progress and peak memory usage to stderr
 		if (pool is None) or (pool.is_master()):
-			logstderr.info("Progress: {0:.2f}%, peak memory usage: {1:.3f} (task), {2[0]:.3f} (all {2[1]} tasks)".format(100*(rloc+1.)/realizations_per_task,peak_memory_task,peak_memory_all))
+			logstderr.info("Progress: {0:.2f}%, peak memory usage: {1:.3f} (task)".format(100*(r-realization_offset+1.)/catalog_realizations,peak_memory_task))
 
 
 	#Safety sync barrier
 	if pool is not None:
 		pool.comm.Barrier()
 
+	#Log final peak memory usage, now that all the tasks are done
+	peak_memory_task,peak_memory_all = peakMemory(),peakMemoryAll(pool)
+
 	if (pool is None) or (pool.is_master()):	
 		now = time.time()
+		logstderr.info("Final peak memory usage: {0:.3f} (task), {1[0]:.3f} (all {1[1]} tasks)".format(peak_memory_task,peak_memory_all))
 		logdriver.info("Total runtime {0:.3f}s".format(now-begin))
 
 
@@ -101,18 +101,18 @@ class FastPMSnapshot(NbodySnapshot):
 		#Get data pointer
 		data = bigfile.BigData(self.fp)
 		
-		#Read in positions in Mpc/h
+		#Read in positions in Mpc/h (wrap the slab that was read without copying it)
 		if (first is None) or (last is None):
-			positions = data["Position"][:]*self.Mpc_over_h
+			positions = u.Quantity(data["Position"][:],unit=self.Mpc_over_h,copy=False)
 			aemit = data["Aemit"][:]
 		else:
-			positions = data["Position"][first:last]*self.Mpc_over_h
+			positions = u.Quantity(data["Position"][first:last],unit=self.Mpc_over_h,copy=False)
 			aemit = data["Aemit"][first:last]
 
-		#Enforce periodic boundary conditions
-		for n in (0,1):
-			positions[:,n][positions[:,n]<0] += self.header["box_size"]
-			positions[:,n][positions[:,n]>self.header["box_size"]] -= self.header["box_size"]
+		#Enforce periodic boundary conditions (in place on the raw values, in a single pass over x and y)
+		box_size = self.header["box_size"].to(positions.unit).value
+		xy = positions.value[:,:2]
+		np.mod(xy,box_size,out=xy)
 
 		#Maybe save
 		if save:
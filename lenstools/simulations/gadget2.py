@@ -1,11 +1,6 @@
 from __future__ import division
 import sys,os
 
-if sys.version_info.major>=3:
-	from io import StringIO
-else:
-	from StringIO import StringIO
-
 from .nbody import NbodySnapshot
 from .. import extern as ext
 from .settings import LTSettings
@@ -158,10 +153,8 @@ class Gadget2Settings(LTSettings):
 
 		"""
 
-		output = StringIO()
-
 		#Write preamble
-		output.write("% {0}\n\n".format(section))
+		lines = [ "% {0}\n\n".format(section) ]
 
 		#Cycle through options
 		for option in getattr(self,section):
@@ -180,13 +173,21 @@ class Gadget2Settings(LTSettings):
 					value = value.to(u.Mbyte).value
 
 			#Write the line
-			output.write("{0}		{1}\n".format(option,value))
+			lines.append("{0}		{1}\n".format(option,value))
 
 		#Finish
-		output.write("\n\n")
-		output.seek(0)
+		lines.append("\n\n")
+
+		return "".join(lines)
+
+	def writeSections(self,sections):
+
+		"""
+		Writes several consecutive sections of the Gadget2 parameter file in one string
+
+		"""
 
-		return output.read()
+		return "".join([ self.writeSection(section) for section in sections ])
 		
 
 	@classmethod
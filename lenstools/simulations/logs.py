@@ -31,6 +31,14 @@ for logger in [logpreamble,logdriver,logplanes,logray,logcmb]:
 logstderr.addHandler(console_error)
 logstderr.propagate = False
 
+#Simulation pipeline bookkeeping messages: plain text on stdout, silenced by raising the level above INFO
+logpipeline = logging.getLogger("lenstools.pipeline")
+console_pipeline = logging.StreamHandler(sys.stdout)
+console_pipeline.setFormatter(logging.Formatter("%(message)s"))
+logpipeline.addHandler(console_pipeline)
+logpipeline.setLevel(logging.INFO)
+logpipeline.propagate = False
+
 #######################
 #Peak memory usage log#
 #######################
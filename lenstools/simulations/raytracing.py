@@ -4,6 +4,8 @@ from ..image.shear import Spin1,Spin2,ShearMap
 import sys
 import time
 import gc
+import copy
+from collections import OrderedDict
 
 from .logs import logplanes,logray,logstderr,peakMemory
 
@@ -187,7 +189,7 @@ class Plane(Spin0):
 			raise ValueError("Format {0} not implemented yet!!".format(format))
 
 
-	def randomRoll(self,seed=None,lmesh=None):
+	def randomRoll(self,seed=None,lmesh=None,random_state=None):
 
 		"""
 		Randomly shifts the plane along its axes, enforcing periodic boundary conditions
@@ -198,6 +200,9 @@ class Plane(Spin0):
 		:param lmesh: the FFT frequency meshgrid (lx,ly) necessary for the calculations in fourier space; if None, a new one is computed from scratch (must have the appropriate dimensions)
 		:type lmesh: array
 
+		:param random_state: generator to draw the shifts from; if None, the global numpy one is used
+		:type random_state: RandomState
+
 		"""
 
 		now = time.time()
@@ -206,10 +211,13 @@ class Plane(Spin0):
 		if seed is not None:
 			np.random.seed(seed)
 
+		if random_state is None:
+			random_state = np.random
+
 		if self.space=="real":
 
 			#Roll in real space
-			self.data = np.roll(np.roll(self.data,np.random.randint(0,self.data.shape[0]),axis=0),np.random.randint(0,self.data.shape[1]),axis=1)	
+			self.data = np.roll(np.roll(self.data,random_state.randint(0,self.data.shape[0]),axis=0),random_state.randint(0,self.data.shape[1]),axis=1)	
 		
 		elif self.space=="fourier":
 
@@ -224,7 +232,7 @@ class Plane(Spin0):
 			logplanes.debug("l meshgrid initialized in {0:.3f}s".format(now-last_timestamp))
 			last_timestamp = now 
 
-			random_shift = np.random.randint(0,self.data.shape[0],size=2)
+			random_shift = random_state.randint(0,self.data.shape[0],size=2)
 			self.data *= np.exp(2.0j*np.pi*np.tensordot(random_shift,l,axes=(0,0)))
 
 			#Timestamp
@@ -972,20 +980,104 @@ class ShearTensorPlane(Spin2):
 ###############RayTracer class#########################
 #######################################################
 
+def _shearProduct(shear,jacobian,out,buf):
+
+	"""
+	Product of the shear matrices [[xx,xy],[xy,yy]] with the jacobians [[j0,j1],[j2,j3]] of the light rays, computed component by component into out (buf is scratch space of the size of a single component)
+
+	"""
+
+	np.multiply(jacobian[0],shear[0],out=out[0])
+	out[0] += np.multiply(jacobian[2],shear[2],out=buf)
+
+	np.multiply(jacobian[1],shear[0],out=out[1])
+	out[1] += np.multiply(jacobian[3],shear[2],out=buf)
+
+	np.multiply(jacobian[2],shear[1],out=out[2])
+	out[2] += np.multiply(jacobian[0],shear[2],out=buf)
+
+	np.multiply(jacobian[3],shear[1],out=out[3])
+	out[3] += np.multiply(jacobian[1],shear[2],out=buf)
+
+	return out
+
+
+class PlaneCache(object):
+
+	"""
+	Least recently used cache of the lens planes read from disk, with a memory budget: it can be shared between RayTracer instances so that a plane drawn again in a later realization is not read from disk again
+
+	:param max_size: memory budget of the cache in bytes (planes larger than this are never cached)
+	:type max_size: int.
+
+	"""
+
+	def __init__(self,max_size):
+
+		self.max_size = max_size
+		self.size = 0
+		self._planes = OrderedDict()
+
+	def __len__(self):
+		return len(self._planes)
+
+	def load(self,filename,loader):
+
+		"""
+		Get the plane stored in filename, reading it with loader only if it is not cached; the returned plane owns a copy of the cached data, so it can be rolled and rescaled freely
+
+		"""
+
+		if filename in self._planes:
+			
+			#Mark the plane as the most recently used
+			plane = self._planes.pop(filename)
+			self._planes[filename] = plane
+			logray.info("Plane {0} found in cache".format(filename))
+
+		else:
+
+			plane = loader(filename)
+			nbytes = plane.data.nbytes
+
+			if nbytes>self.max_size:
+				return plane
+
+			#Evict the least recently used planes until the new one fits
+			while self.size+nbytes>self.max_size:
+				evicted = self._planes.popitem(last=False)[1]
+				self.size -= evicted.data.nbytes
+
+			self._planes[filename] = plane
+			self.size += nbytes
+
+		current_lens = copy.copy(plane)
+		current_lens.data = plane.data.copy()
+		return current_lens
+
+
 class RayTracer(object):
 
 	"""
 	Class handler of ray tracing operations: it mainly computes the path corrections of light rays that travel through a set of gravitational lenses
 
+	:param plane_cache: if not None, lens planes specified by filename are read through this cache
+	:type plane_cache: PlaneCache
+
+	:param random_state: generator to draw the random rolls of the lenses from; if None, the global numpy one is used
+	:type random_state: RandomState
+
 	"""
 
-	def __init__(self,lens_mesh_size=None,lens_type=PotentialPlane):
+	def __init__(self,lens_mesh_size=None,lens_type=PotentialPlane,plane_cache=None,random_state=None):
 
 		self.Nlenses = 0
 		self.lens = list()
 		self.distance = list()
 		self.redshift = list()
 		self.lens_type = lens_type
+		self.plane_cache = plane_cache
+		self.random_state = random_state
 
 		#If we know the size of the lens planes already we can compute, once and for all, the FFT meshgrid
 		if lens_mesh_size is not None:
@@ -1041,12 +1133,17 @@ class RayTracer(object):
 		elif type(lens)==str:
 				
 			logray.info("Reading plane from {0}...".format(lens))
-			current_lens = self.lens_type.load(lens)
+
+			if self.plane_cache is not None:
+				current_lens = self.plane_cache.load(lens,self.lens_type.load)
+			else:
+				current_lens = self.lens_type.load(lens)
+
 			logray.info("Read plane from {0}...".format(lens))
 			logstderr.debug("Read plane: peak memory usage {0:.3f} (task)".format(peakMemory()))
 			
 			logray.info("Randomly rolling lens at z={0:.3f} along its axes...".format(current_lens.redshift))
-			current_lens.randomRoll()
+			current_lens.randomRoll(random_state=self.random_state)
 			logray.info("Rolled lens at z={0:.3f} along its axes...".format(current_lens.redshift))
 			logstderr.debug("Rolled lens: peak memory usage {0:.3f} (task)".format(peakMemory()))
 
@@ -1070,7 +1167,7 @@ class RayTracer(object):
 			np.random.seed(seed)
 
 		for lens in self.lens:
-			lens.randomRoll(seed=None,lmesh=self.lmesh)
+			lens.randomRoll(seed=None,lmesh=self.lmesh,random_state=self.random_state)
 
 
 	def reorderLenses(self):
@@ -1150,9 +1247,9 @@ class RayTracer(object):
 			current_jacobian = np.outer(np.array([1.0,0.0,0.0,1.0]),np.ones(initial_positions.shape[1:])).reshape((4,)+initial_positions.shape[1:])
 			current_jacobian_deflection = np.zeros(current_jacobian.shape)
 
-			#Useful to compute the product of the jacobian (2x2 matrix) with the shear matrix (2x2 symmetric matrix)
-			dotter = np.zeros((4,3,4))
-			dotter[(0,0,1,1,2,2,3,3),(0,2,0,2,2,1,2,1),(0,2,1,3,0,2,1,3)] = 1
+			#Buffers for the product of the jacobian (2x2 matrix) with the shear matrix (2x2 symmetric matrix), reused at every lens
+			shear_product = np.empty(current_jacobian.shape)
+			shear_product_buf = np.empty(current_jacobian.shape[1:])
 
 		#Decide which is the last lens the light rays should cross
 		if type(z)==np.ndarray:
@@ -1248,7 +1345,9 @@ class RayTracer(object):
 				current_jacobian_deflection *= (Ak-1)
 
 				#This is the part in which the products with the shear matrix are computed
-				current_jacobian_deflection += Ck * (np.tensordot(dotter,current_jacobian,axes=([2],[0])) * shear_tensors).sum(1)
+				_shearProduct(shear_tensors,current_jacobian,shear_product,shear_product_buf)
+				shear_product *= Ck
+				current_jacobian_deflection += shear_product
 				
 				now = time.time()
 				logray.debug("Shear matrix products computed in {0:.3f}s".format(now-last_timestamp))
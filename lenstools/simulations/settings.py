@@ -4,11 +4,11 @@ from abc import ABCMeta,abstractproperty,abstractmethod
 
 from distutils import config
 
+import pickle as pkl
+
 if sys.version_info.major>=3:
-	import _pickle as pkl
 	from configparser import NoOptionError
 else:
-	import cPickle as pkl
 	from ConfigParser import NoOptionError
 
 import json
@@ -36,7 +36,7 @@ def select_parser(filename,read=True):
 		
 		options = PickleParser()
 		if read:
-			with open(filename,"r") as fp:
+			with open(filename,"rb") as fp:
 				options._buffer = options.load(fp)
 				options.filename = filename
 		
@@ -2,7 +2,7 @@ import os
 from ..pipeline.simulation import SimulationBatch
 
 from ..pipeline.settings import *
-from ..pipeline.remote import LocalGit
+from ..pipeline.remote import LocalSystem,LocalGit
 
 from ..pipeline.simulation import LensToolsCosmology
 from ..pipeline.settings import Gadget2Settings
@@ -122,3 +122,55 @@ def test_Gadget2Param():
 		for collection in model.collections:
 			for ic in collection.realizations:
 				ic.writeGadget2(settings)
+
+
+def test_realization_settings():
+
+	#A realization fetched again from its collection must carry the settings written along with the parameter file
+	settings = Gadget2Settings()
+
+	for model in batch.available:
+		for collection in model.collections:
+			for ic in collection.realizations:
+				
+				ic.writeGadget2(settings)
+				r = collection.getRealization(ic.ic_index)
+				assert hasattr(r,"gadget_settings")
+				assert r.gadget_settings.NumFilesPerSnapshot==settings.NumFilesPerSnapshot
+
+
+def test_listdir():
+
+	#Directory listings report the entry names and which of them are directories
+	try:
+		os.makedirs("SimTest/Listdir/subdir")
+	except:
+		pass
+
+	with open("SimTest/Listdir/file.txt","w") as fp:
+		fp.write("test")
+
+	handlers = [LocalSystem()]
+	try:
+		handlers.append(LocalGit())
+	except ImportError:
+		pass
+
+	for handler in handlers:
+		assert dict(handler.listdir("SimTest/Listdir"))=={"subdir":True,"file.txt":False}
+		assert handler.listdir("SimTest/Listdir/missing")==list()
+
+
+def test_listing_after_creation():
+
+	#Directories created after a listing (also outside the tree API) must show up in the next one
+	collection = batch.available[0].collections[0]
+	
+	num_realizations = len(collection.realizations)
+	collection.newRealization(seed=333)
+	assert len(collection.realizations)==num_realizations+1
+
+	catalog = collection.getCatalog("Catalog")
+	num_subcatalogs = len(catalog.subcatalogs)
+	os.mkdir(os.path.join(catalog.storage_subdir,"{0}-{0}".format(num_subcatalogs+1)))
+	assert len(catalog.subcatalogs)==num_subcatalogs+1
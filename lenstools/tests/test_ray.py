@@ -1,13 +1,13 @@
 import os
 
-from ..simulations.raytracing import RayTracer,PotentialPlane,DeflectionPlane
+from ..simulations.raytracing import RayTracer,PotentialPlane,DeflectionPlane,PlaneCache
 from .. import ConvergenceMap,OmegaMap,ShearMap
 
 from .. import dataExtern
 
 import numpy as np
 import matplotlib.pyplot as plt
-from astropy.units import deg,rad,arcmin
+from astropy.units import deg,rad,arcmin,Mpc
 
 import logging
 import time
@@ -269,3 +269,67 @@ def test_continuous_distortion():
 		ax.set_title("z={:.2f}".format(tracer.redshift[n]))	
 		fig.savefig("distortion{0}.png".format(n))	 
 
+
+
+def test_plane_cache():
+
+	#Loader that counts the reads from "disk"
+	reads = list()
+	def loader(filename):
+		reads.append(filename)
+		return PotentialPlane(data=np.random.rand(16,16),angle=1.0*deg,redshift=1.0,comoving_distance=1000.0*Mpc)
+
+	plane_bytes = 16*16*8
+	cache = PlaneCache(max_size=2*plane_bytes)
+
+	#A hit returns a copy: rolling it leaves the cached plane untouched
+	first = cache.load("a",loader)
+	cached_data = first.data.copy()
+	hit = cache.load("a",loader)
+	hit.randomRoll(random_state=np.random.RandomState(1))
+	hit.data *= 2.0
+	assert reads==["a"]
+	assert (cache.load("a",loader).data==cached_data).all()
+
+	#Least recently used planes are evicted to stay within the budget
+	cache.load("b",loader)
+	cache.load("a",loader)
+	cache.load("c",loader)
+	assert len(cache)==2
+	assert cache.size<=cache.max_size
+	cache.load("b",loader)
+	assert reads==["a","b","c","b"]
+
+	#Planes larger than the budget are never stored
+	small_cache = PlaneCache(max_size=plane_bytes//2)
+	small_cache.load("a",loader)
+	small_cache.load("a",loader)
+	assert len(small_cache)==0
+	assert small_cache.size==0
+	assert reads[-2:]==["a","a"]
+
+def test_plane_info():
+
+	from ..scripts.raytracing import _planeInfo
+
+	#Write a small lens plane summary file
+	info_filename = "plane_info_test.txt"
+	with open(info_filename,"w") as infofile:
+		infofile.write("s=0,d=120.0 Mpc/h,z=0.04\n")
+		infofile.write("s=1,d=240.0 Mpc,z=0.08\n")
+
+	try:
+		snapshot_numbers,distances,lens_redshifts = _planeInfo(info_filename,1.4*Mpc)
+	finally:
+		os.remove(info_filename)
+
+	assert snapshot_numbers==[0,1]
+	assert distances[0].unit.physical_type=="length"
+
+	#The parsed specifications must be accepted by the ray tracer as they are
+	info_tracer = RayTracer(lens_mesh_size=16)
+	for s,n in enumerate(snapshot_numbers):
+		info_tracer.addLens(("snap{0}_potentialPlane0_normal0.fits".format(n),distances[s],lens_redshifts[s]))
+
+	assert info_tracer.Nlenses==2
+	assert info_tracer.redshift==[0.04,0.08]
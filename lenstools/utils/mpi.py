@@ -146,6 +146,47 @@ class MPIWhirlPool(MPIPool):
 	
 	#######################################################################################################################
 
+	def queue(self,start,stop):
+
+		"""
+		Distribute the indices in [start,stop) among all the tasks (master included) on demand: each task fetches the next index from a counter that lives on the master as soon as it is done with the previous one. This is a collective call
+
+		:param start: first index to distribute
+		:type start: int
+
+		:param stop: one past the last index to distribute
+		:type stop: int
+
+		:returns: generator over the indices assigned to this task
+
+		"""
+
+		#Shared counter on the master, accessed with atomic fetch-and-add
+		counter = np.zeros(1,dtype=np.int64)
+		win = MPI.Win.Create(memory=counter,disp_unit=counter.itemsize,comm=self.comm)
+
+		increment = np.ones(1,dtype=np.int64)
+		fetched = np.zeros(1,dtype=np.int64)
+
+		try:
+
+			while True:
+
+				win.Lock(0,MPI.LOCK_SHARED)
+				win.Fetch_and_op(increment,fetched,0,op=MPI.SUM)
+				win.Unlock(0)
+
+				index = start + int(fetched[0])
+				if index>=stop:
+					break
+
+				yield index
+
+		finally:
+			win.Free()
+
+	#######################################################################################################################
+
 	def closeWindow(self):
 
 		"""
@@ -3,11 +3,15 @@ sys.path.append("..")
 
 from lenstools.simulations import Gadget2SnapshotDE
 import numpy as np
-from mayavi import mlab
 
 snap = Gadget2SnapshotDE.open("Data/gadget/snapshot_001")
 plane,res,NumPart = snap.cutPlaneAngular(normal=2,center=7.0*snap.Mpc_over_h,thickness=0.5*snap.Mpc_over_h,plane_size=snap.lensMaxSize(),plane_resolution=128,thickness_resolution=8,smooth=2,tomography=True)
 
-scene = mlab.pipeline.volume(mlab.pipeline.scalar_field(plane))
-
 snap.close()
+
+#Mayavi (VTK,Qt) is slow to import: render only when asked to, otherwise just save the plane
+if "--interactive" in sys.argv:
+	from mayavi import mlab
+	scene = mlab.pipeline.volume(mlab.pipeline.scalar_field(plane))
+else:
+	np.save("plane.npy",plane)